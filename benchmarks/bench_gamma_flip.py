@@ -0,0 +1,124 @@
+# bench_gamma_flip.py - Compare the vectorized gamma flip against the row-wise original
+#
+# Usage: python benchmarks/bench_gamma_flip.py [raw_options.parquet] [--tickers N]
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gamma_analysis import calculate_gamma_flip
+
+def legacy_gamma_flip(ticker, all_options, spot, fromStrike, toStrike, today):
+    """Original df.apply implementation, kept for comparison"""
+    df_calls = pd.concat([opt[0] for opt in all_options], ignore_index=True)
+    df_puts = pd.concat([opt[1] for opt in all_options], ignore_index=True)
+    
+    df_calls = df_calls[(df_calls['strike'] >= fromStrike) & (df_calls['strike'] <= toStrike)]
+    df_puts = df_puts[(df_puts['strike'] >= fromStrike) & (df_puts['strike'] <= toStrike)]
+    if df_calls.empty or df_puts.empty:
+        return None
+    
+    df = pd.merge(df_calls, df_puts, on=['ExpirationDate', 'strike'], suffixes=('_call', '_put'))
+    if df.empty:
+        return None
+    df = df.rename(columns={'strike': 'StrikePrice'})
+    df['daysTillExp'] = [1/252 if (np.busday_count(today, exp.date())) == 0 
+                    else np.busday_count(today, exp.date())/252 for exp in df['ExpirationDate']]
+    
+    levels = np.linspace(fromStrike, toStrike, 30)
+    totalGamma = []
+    
+    def calcGammaEx(S, K, vol, T, r, q, optType, OI):
+        if T == 0 or vol == 0:
+            return 0
+        dp = (np.log(S/K) + (r - q + 0.5*vol**2)*T) / (vol*np.sqrt(T))
+        gamma = np.exp(-q*T) * norm.pdf(dp) / (S * vol * np.sqrt(T))
+        return OI * 100 * S * S * 0.01 * gamma
+    
+    for level in levels:
+        df['callGEX'] = df.apply(lambda row: calcGammaEx(level, row['StrikePrice'], row['impliedVolatility_call'],
+                                                    row['daysTillExp'], 0, 0, "call", row['openInterest_call']), axis=1)
+        df['putGEX'] = df.apply(lambda row: calcGammaEx(level, row['StrikePrice'], row['impliedVolatility_put'],
+                                                   row['daysTillExp'], 0, 0, "put", row['openInterest_put']), axis=1)
+        totalGamma.append((df['callGEX'].sum() - df['putGEX'].sum()) / 10**9)
+    
+    zero_crossings = []
+    for i in range(len(levels)-1):
+        if (totalGamma[i] * totalGamma[i+1] <= 0):
+            x0, x1 = levels[i], levels[i+1]
+            y0, y1 = totalGamma[i], totalGamma[i+1]
+            if y0 != y1:
+                zero_crossings.append(x0 - y0 * (x1 - x0) / (y1 - y0))
+    gamma_flip = zero_crossings[0] if zero_crossings else np.nan
+    
+    strike_calls = df.groupby('StrikePrice')['openInterest_call'].sum().nlargest(2).index.tolist()
+    strike_puts = df.groupby('StrikePrice')['openInterest_put'].sum().nlargest(2).index.tolist()
+    return f"{ticker}:{','.join(map(lambda x: f'{int(x)}', strike_calls))},{','.join(map(lambda x: f'{int(x)}', strike_puts))},{gamma_flip:.0f}"
+
+def latest_snapshot(base_dir='options_data'):
+    # Nested year/month/week/day/run_type paths sort chronologically
+    files = glob.glob(os.path.join(base_dir, '**', 'raw_options.parquet'), recursive=True)
+    return max(files) if files else None
+
+def snapshot_date(raw):
+    # Older snapshots predate the trading_date column
+    if 'trading_date' in raw.columns:
+        return pd.to_datetime(raw['trading_date'].iloc[0]).date()
+    return raw['lastTradeDate'].max().date()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('snapshot', nargs='?', help='raw_options.parquet file (defaults to the newest in options_data/)')
+    parser.add_argument('--tickers', type=int, default=None, help='Only benchmark the first N tickers')
+    args = parser.parse_args()
+    
+    snapshot = args.snapshot or latest_snapshot()
+    if snapshot is None:
+        sys.exit("No raw_options.parquet snapshot found")
+    
+    raw = pd.read_parquet(snapshot)
+    today = snapshot_date(raw)
+    tickers = list(dict.fromkeys(raw['ticker']))[:args.tickers]
+    print(f"Snapshot: {snapshot} ({len(raw):,} rows, {len(tickers)} tickers, today={today})")
+    
+    legacy_time = new_time = 0.0
+    mismatches = 0
+    for ticker in tickers:
+        chain_df = raw[raw['ticker'] == ticker]
+        spot = chain_df['underlying_price'].iloc[0]
+        fromStrike, toStrike = 0.5 * spot, 2.0 * spot
+        
+        all_options = []
+        for exp, exp_df in chain_df.groupby('expiration', sort=False):
+            calls = exp_df[exp_df['option_type'] == 'call'].assign(ExpirationDate=pd.to_datetime(exp))
+            puts = exp_df[exp_df['option_type'] == 'put'].assign(ExpirationDate=pd.to_datetime(exp))
+            if not calls.empty and not puts.empty:
+                all_options.append((calls, puts))
+        
+        start = time.perf_counter()
+        expected = legacy_gamma_flip(ticker, all_options, spot, fromStrike, toStrike, today) if all_options else None
+        legacy_time += time.perf_counter() - start
+        
+        start = time.perf_counter()
+        # The original counted every weekday, so leave market holidays out here
+        result = calculate_gamma_flip(ticker, chain_df, spot, fromStrike, toStrike, today, holidays=[])
+        new_time += time.perf_counter() - start
+        
+        if result != expected:
+            mismatches += 1
+            print(f"MISMATCH {ticker}: legacy={expected} vectorized={result}")
+    
+    print(f"Legacy (df.apply):  {legacy_time:8.2f}s")
+    print(f"Vectorized:         {new_time:8.2f}s")
+    print(f"Speedup:            {legacy_time / new_time:8.1f}x")
+    print(f"Mismatched tickers: {mismatches}/{len(tickers)}")
+
+if __name__ == "__main__":
+    main()
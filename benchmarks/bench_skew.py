@@ -0,0 +1,95 @@
+# bench_skew.py - Compare the groupby skew analysis against the nested-loop original
+#
+# Usage: python benchmarks/bench_skew.py [vol_surface.parquet ...] [--repeat N]
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from volatility_analysis import analyze_skew
+
+def legacy_analyze_skew(df):
+    """Original per-ticker, per-expiration loop, kept for comparison"""
+    skew_data = {}
+    
+    for ticker in df['ticker'].unique():
+        ticker_df = df[df['ticker'] == ticker]
+        
+        for exp in ticker_df['expiration'].unique():
+            exp_df = ticker_df[ticker_df['expiration'] == exp]
+            calls = exp_df[exp_df['option_type'] == 'call']
+            puts = exp_df[exp_df['option_type'] == 'put']
+            
+            if len(calls) > 3 and len(puts) > 3:
+                otm_puts = puts[puts['moneyness'] < 0.95].sort_values('moneyness', ascending=False).head(3)
+                otm_calls = calls[calls['moneyness'] > 1.05].sort_values('moneyness').head(3)
+                
+                if not otm_puts.empty and not otm_calls.empty:
+                    put_avg_iv = otm_puts['impliedVolatility'].mean()
+                    call_avg_iv = otm_calls['impliedVolatility'].mean()
+                    skew = put_avg_iv - call_avg_iv
+                    
+                    key = f"{ticker}_{exp}"
+                    skew_data[key] = {
+                        'ticker': ticker,
+                        'expiration': exp,
+                        'dte': exp_df['dte'].iloc[0],
+                        'put_iv': put_avg_iv,
+                        'call_iv': call_avg_iv,
+                        'skew': skew,
+                        'skew_direction': 'Downside' if skew > 0 else 'Upside'
+                    }
+    
+    return pd.DataFrame.from_dict(skew_data, orient='index')
+
+def timed(func, df, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('snapshots', nargs='*', help='vol_surface.parquet files (defaults to every one under options_data*/)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing runs per snapshot (best is kept)')
+    args = parser.parse_args()
+    
+    snapshots = args.snapshots or sorted(glob.glob(os.path.join('options_data*', '**', 'vol_surface.parquet'), recursive=True))
+    if not snapshots:
+        sys.exit("No vol_surface.parquet snapshot found")
+    
+    legacy_total = new_total = 0.0
+    mismatches = 0
+    for snapshot in snapshots:
+        df = pd.read_parquet(snapshot)
+        expected, legacy_time = timed(legacy_analyze_skew, df, args.repeat)
+        result, new_time = timed(analyze_skew, df, args.repeat)
+        legacy_total += legacy_time
+        new_total += new_time
+        
+        try:
+            # Snapshots in the compact schema hold float32 IVs and categorical
+            # keys, which the two implementations carry through differently
+            pd.testing.assert_frame_equal(result, expected, check_dtype=False,
+                                          check_categorical=False, rtol=1e-5)
+            status = "ok"
+        except AssertionError as e:
+            mismatches += 1
+            status = f"MISMATCH: {e}"
+        print(f"{snapshot}: {len(df):,} rows, {len(result)} slices, "
+              f"legacy {legacy_time:.3f}s, groupby {new_time:.3f}s ({legacy_time / new_time:.1f}x) {status}")
+    
+    print(f"Legacy (loops): {legacy_total:8.2f}s")
+    print(f"Groupby:        {new_total:8.2f}s")
+    print(f"Speedup:        {legacy_total / new_total:8.1f}x")
+    print(f"Mismatched snapshots: {mismatches}/{len(snapshots)}")
+
+if __name__ == "__main__":
+    main()
@@ -1,327 +1,408 @@
 import pandas as pd
 import os
-from glob import glob
-import datetime
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
-def build_options_master_database(
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from schema_registry import migrate_raw_options_table, read_raw_options
+from snapshot_dataset import write_snapshot_runs, load_snapshots, get_dataset_path
+
+# The master database is a snapshot dataset (see snapshot_dataset.py) under
+# output_dir: each raw_options.parquet becomes its own date/run_type partition,
+# so new files are appended as partitions and the existing data is never rewritten.
+MANIFEST_COLUMNS = ['file_path', 'mtime', 'size', 'num_rows', 'trading_date', 'run_type']
+
+# Number of raw files read concurrently during ingestion
+DEFAULT_INGEST_WORKERS = int(os.environ.get('OPTIONS_INGEST_WORKERS', 8))
+
+# Raw files combined into one Arrow table and written per pass
+INGEST_BATCH_FILES = 50
+
+def get_manifest_path(output_dir='options_db', master_name='options_master'):
+    """
+    Path of the manifest recording which raw files are in the master database
+
+    Args:
+        output_dir (str): Directory holding the master database
+        master_name (str): Name of the master dataset
+
+    Returns:
+        str: Manifest file path
+    """
+    return os.path.join(output_dir, f'{master_name}_manifest.parquet')
+
+def load_manifest(output_dir='options_db', master_name='options_master'):
+    """
+    Load the manifest, indexed by file path
+
+    Args:
+        output_dir (str): Directory holding the master database
+        master_name (str): Name of the master dataset
+
+    Returns:
+        pd.DataFrame: One row per imported raw file (empty if there is no manifest yet)
+    """
+    manifest_path = get_manifest_path(output_dir, master_name)
+    if os.path.exists(manifest_path):
+        return pd.read_parquet(manifest_path).set_index('file_path')
+    return pd.DataFrame(columns=MANIFEST_COLUMNS).set_index('file_path')
+
+def save_manifest(manifest, output_dir='options_db', master_name='options_master'):
+    """
+    Save the manifest through a temporary file so it is never left half-written
+
+    Args:
+        manifest (pd.DataFrame): Manifest indexed by file path
+        output_dir (str): Directory holding the master database
+        master_name (str): Name of the master dataset
+    """
+    manifest_path = get_manifest_path(output_dir, master_name)
+    tmp_path = manifest_path + '.tmp'
+    manifest.reset_index().to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, manifest_path)
+
+def find_raw_files(base_dir='options_data', run_type_filter=None):
+    """
+    Find raw_options.parquet files and read their date and run type from the path
+
+    Args:
+        base_dir (str): Base directory containing the year/month/week/day/run_type folders
+        run_type_filter (str): Only include this run_type ('evening', 'morning', or None for all)
+
+    Returns:
+        list: (file_path, path_info, trading_date, run_type) tuples
+    """
+    raw_files = []
+    for root, _, files in os.walk(base_dir):
+        if 'raw_options.parquet' not in files:
+            continue
+        path_parts = root.split(os.path.sep)
+        if len(path_parts) < 5:
+            print(f"Skipping {root}: not in the year/month/week/day/run_type layout")
+            continue
+
+        year, month, _, day, run_type = path_parts[-5:]
+        if run_type_filter and run_type != run_type_filter:
+            continue
+        try:
+            trading_date = datetime(int(year), int(month), int(day))
+        except ValueError:
+            print(f"Skipping {root}: could not read the trading date from the path")
+            continue
+
+        path_info = '/'.join(path_parts[-5:])
+        raw_files.append((os.path.join(root, 'raw_options.parquet'), path_info, trading_date, run_type))
+    return sorted(raw_files, key=lambda f: (f[2], f[3]))
+
+def _dictionary_to_timestamp(column):
+    """Parse a dictionary-encoded date column once per distinct value"""
+    chunks = [pc.take(chunk.dictionary.cast(pa.timestamp('us')), chunk.indices) for chunk in column.chunks]
+    return pa.chunked_array(chunks, pa.timestamp('us'))
+
+def read_raw_file(file_path, path_info, trading_date, run_type, run_type_filter=None):
+    """
+    Read one raw options file as Arrow with the master database's derived columns
+
+    Files are read in RAW_OPTIONS_SCHEMA (older versions are migrated in
+    memory, see schema_registry), so every file yields the same schema and
+    the tables concatenate as-is.
+
+    Args:
+        file_path (str): raw_options.parquet path
+        path_info (str): year/month/week/day/run_type folder of the file
+        trading_date (datetime): Trading date read from the path
+        run_type (str): Run type read from the path
+        run_type_filter (str): Only keep rows of this run_type
+
+    Returns:
+        pa.Table: Rows to store for this file
+    """
+    table = read_raw_options(file_path, trading_date)
+
+    # Apply run_type filter at the table level as a failsafe
+    if run_type_filter:
+        table = table.filter(pc.equal(table.column('run_type'), run_type_filter))
+    return _add_master_columns(table, path_info, trading_date, run_type)
+
+def _add_master_columns(table, path_info, trading_date, run_type):
+    """Add the master database's derived and partition columns to a RAW_OPTIONS_SCHEMA table"""
+    num_rows = table.num_rows
+    trading_dates = pc.fill_null(table.column('trading_date'), pa.scalar(trading_date.date(), pa.date32()))
+    trading_dates = trading_dates.cast(pa.timestamp('us'))
+    expirations = _dictionary_to_timestamp(table.column('expiration'))
+    derived = {
+        'trading_date': trading_dates,
+        'expiration': expirations,
+        'days_to_expiry': pc.days_between(trading_dates, expirations),
+        'moneyness': pc.divide(table.column('strike'), table.column('underlying_price')),
+        'path_info': pa.repeat(pa.scalar(path_info, pa.string()), num_rows),
+        # Partition columns for write_snapshot_runs
+        'date': pa.repeat(pa.scalar(trading_date.date(), pa.date32()), num_rows),
+        'run_type': pa.repeat(pa.scalar(run_type, pa.string()), num_rows),
+    }
+
+    for name, column in derived.items():
+        if name in table.column_names:
+            table = table.set_column(table.schema.get_field_index(name), name, column)
+        else:
+            table = table.append_column(name, column)
+    return table
+
+def read_raw_files(raw_files, run_type_filter=None, max_workers=DEFAULT_INGEST_WORKERS):
+    """
+    Read raw options files on a thread pool into a single Arrow table
+
+    Parquet decoding releases the GIL, so files are read in parallel. Every
+    file is read in the registry schema, so the tables concatenate without
+    copying or casting afterwards.
+
+    Args:
+        raw_files (list): (file_path, path_info, trading_date, run_type) tuples
+        run_type_filter (str): Only keep rows of this run_type
+        max_workers (int): Number of files read concurrently
+
+    Returns:
+        tuple: (pa.Table of all rows, {file_path: row count} for the files read successfully)
+    """
+    tables = []
+    row_counts = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(read_raw_file, *raw_file, run_type_filter) for raw_file in raw_files]
+        for (file_path, path_info, _, _), future in zip(raw_files, futures):
+            try:
+                table = future.result()
+                tables.append(table)
+                row_counts[file_path] = table.num_rows
+                print(f"Processed {path_info} ({table.num_rows:,} rows)")
+            except Exception as e:
+                print(f"Error processing {path_info}: {str(e)}")
+
+    if not tables:
+        return None, row_counts
+    return pa.concat_tables(tables), row_counts
+
+def import_legacy_master(legacy_path, base_dir='options_data', output_dir='options_db',
+                         master_name='options_master', run_type_filter='evening'):
+    """
+    Copy a single-file options_master.parquet into the partitioned master dataset
+
+    Each run is conformed to RAW_OPTIONS_SCHEMA and given the same derived
+    columns as rows read from raw files. The raw files under base_dir that the
+    legacy master already covers (same folder, or same date and run type, as
+    the old builder checked) are recorded in the manifest so they are not
+    ingested again.
+
+    Args:
+        legacy_path (str): Path of the old single-file master database
+        base_dir (str): Base directory containing the nested folder structure
+        output_dir (str): Directory holding the master database
+        master_name (str): Name of the master dataset
+        run_type_filter (str): Only seed the manifest with raw files of this run_type
+
+    Returns:
+        int: Number of date/run_type partitions imported
+    """
+    legacy_db = pd.read_parquet(legacy_path)
+    legacy_db['trading_date'] = pd.to_datetime(legacy_db['trading_date'].astype(str))
+    # Back to the raw files' string dates so they parse like freshly read files
+    legacy_db['expiration'] = pd.to_datetime(legacy_db['expiration'].astype(str)).dt.strftime('%Y-%m-%d')
+    if 'path_info' not in legacy_db.columns:
+        legacy_db['path_info'] = 'unknown'
+
+    imported = 0
+    run_rows = {}
+    path_runs = {}
+    for (trading_date, run_type), df in legacy_db.groupby(['trading_date', 'run_type'], observed=True):
+        trading_date = trading_date.to_pydatetime()
+        path_info = str(df['path_info'].iloc[0])
+        table = migrate_raw_options_table(pa.Table.from_pandas(df, preserve_index=False), trading_date)
+        table = _add_master_columns(table, path_info, trading_date, run_type)
+        write_snapshot_runs(table, master_name, base_dir=output_dir)
+
+        run_rows[(trading_date.date(), run_type)] = table.num_rows
+        path_runs.update({path: (trading_date.date(), run_type) for path in df['path_info'].unique()})
+        imported += 1
+
+    manifest = load_manifest(output_dir, master_name)
+    for file_path, path_info, trading_date, run_type in find_raw_files(base_dir, run_type_filter):
+        run = path_runs.get(path_info, (trading_date.date(), run_type))
+        if run not in run_rows:
+            continue
+        stat = os.stat(file_path)
+        manifest.loc[file_path] = {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'num_rows': run_rows.pop(run),
+            'trading_date': trading_date,
+            'run_type': run_type,
+        }
+    save_manifest(manifest, output_dir, master_name)
+    return imported
+
+def update_options_master(
     base_dir='options_data',
     output_dir='options_db',
-    master_file='options_master.parquet',
-    run_type_filter='evening',  # Added parameter to filter by run_type
-    incremental=True
+    master_name='options_master',
+    run_type_filter='evening',
+    incremental=True,
+    max_workers=DEFAULT_INGEST_WORKERS
 ):
     """
-    Build or update a master database from raw options parquet files in nested directories.
-    
+    Build or update the partitioned master database without loading it
+
+    A manifest records the path, mtime, size, row count and date/run_type of
+    every imported file. In incremental mode only files that are missing from
+    the manifest, or whose mtime or size changed, are opened; each one is
+    written as its own date/run_type partition, replacing any earlier import
+    of the same run.
+
     Args:
         base_dir (str): Base directory containing the nested folder structure
         output_dir (str): Directory to store the master database
-        master_file (str): Filename for the master database
+        master_name (str): Name of the master dataset inside output_dir
         run_type_filter (str): Filter to only include specific run_type ('evening', 'morning', or None for all)
         incremental (bool): If True, update existing database; if False, rebuild from scratch
-        
+        max_workers (int): Number of raw files read concurrently
+
     Returns:
-        pd.DataFrame: The master database
+        str: Root directory of the master dataset (read it with load_options_master)
     """
     # Ensure output directory exists
     os.makedirs(output_dir, exist_ok=True)
-    master_path = os.path.join(output_dir, master_file)
-    
-    # Find all raw_options.parquet files recursively
-    all_files = []
+    master_path = get_dataset_path(master_name, base_dir=output_dir)
+
     print(f"Searching for parquet files in {base_dir}...")
-    
-    for root, _, files in os.walk(base_dir):
-        if 'raw_options.parquet' in files:
-            # Check if we're filtering by run_type
-            if run_type_filter:
-                # Check if the path contains the run_type we want
-                path_parts = root.split(os.path.sep)
-                # The run_type is typically the last directory before the file
-                if path_parts and path_parts[-1] == run_type_filter:
-                    file_path = os.path.join(root, 'raw_options.parquet')
-                    date_info = '/'.join(path_parts[-5:]) if len(path_parts) >= 5 else root
-                    all_files.append((file_path, date_info))
-            else:
-                # If not filtering, include all files
-                file_path = os.path.join(root, 'raw_options.parquet')
-                path_parts = root.split(os.path.sep)
-                date_info = '/'.join(path_parts[-5:]) if len(path_parts) >= 5 else root
-                all_files.append((file_path, date_info))
-    
+    all_files = find_raw_files(base_dir, run_type_filter)
     run_type_msg = f" for run_type '{run_type_filter}'" if run_type_filter else ""
     print(f"Found {len(all_files)} raw options files{run_type_msg}")
-    
-    # Check if we should update existing database
-    if incremental and os.path.exists(master_path):
-        print(f"Loading existing master database: {master_path}")
-        try:
-            master_db = pd.read_parquet(master_path)
-            print(f"Loaded {len(master_db):,} rows from existing database")
-            
-            # Track existing data combinations to avoid duplicates
-            # Create a unique identifier for each trading_date + run_type combination
-            # Create a more robust set of keys for identifying existing data
-            existing_dates = set()
-            if 'trading_date' in master_db.columns and 'run_type' in master_db.columns:
-                # Try using trading_date as string + run_type
-                try:
-                    existing_dates_1 = set(
-                        master_db['trading_date'].astype(str) + '_' + master_db['run_type']
-                    )
-                    existing_dates.update(existing_dates_1)
-                    print(f"Created {len(existing_dates_1)} primary identifier keys")
-                except Exception as e:
-                    print(f"Warning: Could not create primary identifier keys: {str(e)}")
-                
-                # Also use the folder path as an alternative identifier
-                # Most reliable for your nested folder structure
-                if 'path_info' not in master_db.columns:
-                    master_db['path_info'] = 'unknown'  # Default for existing data
-                existing_dates.update(set(master_db['path_info']))
-            else:
-                print("Warning: Existing database missing key columns for duplicate detection")
-            
-            # Process all files and check for duplicates
-            new_data_frames = []
-            skipped_files = 0
-            
-            for file_path, date_info in all_files:
-                try:
-                    print(f"Checking {date_info}...")
-                    df = pd.read_parquet(file_path)
-                    
-                    # Skip if empty
-                    if df.empty:
-                        print(f"Skipping empty file: {date_info}")
-                        continue
-                        
-                    # Apply run_type filter at the dataframe level as a failsafe
-                    if run_type_filter and 'run_type' in df.columns:
-                        df = df[df['run_type'] == run_type_filter]
-                        if df.empty:
-                            print(f"Skipping file after filtering: {date_info}")
-                            continue
-                    
-                    # Extract the folder path for more reliable duplication checking
-                    path_info = date_info
-
-                    # Check if this data already exists using multiple methods
-                    is_duplicate = False
-
-                    try:
-                        # Method 1: Check using trading_date + run_type
-                        if 'trading_date' in df.columns and 'run_type' in df.columns:
-                            sample_date = str(df['trading_date'].iloc[0])
-                            sample_run_type = df['run_type'].iloc[0]
-                            sample_key = f"{sample_date}_{sample_run_type}"
-                            
-                            if sample_key in existing_dates:
-                                print(f"Skipping already imported data (by date): {date_info}")
-                                is_duplicate = True
-                    except Exception as e:
-                        print(f"Warning: Could not check duplicate by date: {str(e)}")
-
-                    # Method 2: Check using folder path
-                    if not is_duplicate and path_info in existing_dates:
-                        print(f"Skipping already imported data (by path): {date_info}")
-                        is_duplicate = True
-
-                    # Method 3: For new entries, extract year/month/day from path
-                    # This is a fallback method for when direct comparison fails
-                    if not is_duplicate:
-                        try:
-                            path_parts = date_info.split('/')
-                            if len(path_parts) >= 5:
-                                year, month, _, day, run_type = path_parts[-5:]
-                                date_str = f"{year}-{month}-{day}"
-                                path_key = f"{date_str}_{run_type}"
-                                
-                                if path_key in existing_dates:
-                                    print(f"Skipping already imported data (by path date): {date_info}")
-                                    is_duplicate = True
-                        except Exception as e:
-                            print(f"Warning: Could not extract date from path: {str(e)}")
-
-                    if is_duplicate:
-                        skipped_files += 1
-                        continue
-
-                    # Add path_info to the dataframe for future duplicate detection
-                    df['path_info'] = path_info
-
-                    print(f"Adding new data from: {date_info}")
-                    new_data_frames.append(df)
-                        
-                except Exception as e:
-                    print(f"Error processing {date_info}: {str(e)}")
-            
-            # If we have new data, append it
-            if new_data_frames:
-                print(f"Appending {len(new_data_frames)} new files to master database")
-                try:
-                    # First, concatenate the new data frames
-                    new_data = pd.concat(new_data_frames, ignore_index=True)
-                    
-                    # Ensure datatypes match between new_data and master_db
-                    # For columns that exist in both dataframes
-                    common_columns = set(master_db.columns).intersection(set(new_data.columns))
-                    
-                    # Convert date columns to strings in both dataframes before concat
-                    date_columns = ['trading_date', 'expiration']
-                    for col in date_columns:
-                        if col in common_columns:
-                            # Convert to string in both dataframes to ensure compatibility
-                            master_db[col] = master_db[col].astype(str)
-                            new_data[col] = new_data[col].astype(str) 
-                    
-                    # Apply the same conversions to other key columns if needed
-                    for col in common_columns:
-                        if master_db[col].dtype != new_data[col].dtype:
-                            print(f"Converting column {col} to ensure type compatibility")
-                            # Try to convert to the same type as master_db
-                            try:
-                                new_data[col] = new_data[col].astype(master_db[col].dtype)
-                            except:
-                                # If that fails, convert both to string
-                                print(f"Converting {col} to string in both dataframes")
-                                master_db[col] = master_db[col].astype(str)
-                                new_data[col] = new_data[col].astype(str)
-                                
-                    # Now concatenate with the master database
-                    master_db = pd.concat([master_db, new_data], ignore_index=True)
-                    print(f"Master database now has {len(master_db):,} rows")
-                    
-                    # Re-convert date columns to datetime
-                    for col in date_columns:
-                        if col in master_db.columns:
-                            try:
-                                master_db[col] = pd.to_datetime(master_db[col])
-                                print(f"Converted {col} to datetime")
-                            except Exception as e:
-                                print(f"Warning: Could not convert {col} to datetime: {str(e)}")
-                    
-                    # Recalculate derived columns
-                    try:
-                        # Calculate days-to-expiration
-                        if 'trading_date' in master_db.columns and 'expiration' in master_db.columns:
-                            master_db['days_to_expiry'] = (
-                                pd.to_datetime(master_db['expiration']) - 
-                                pd.to_datetime(master_db['trading_date'])
-                            ).dt.days
-                            
-                        # Calculate moneyness
-                        if 'strike' in master_db.columns and 'underlying_price' in master_db.columns:
-                            master_db['moneyness'] = master_db['strike'] / master_db['underlying_price']
-                    except Exception as e:
-                        print(f"Warning: Error calculating derived columns: {str(e)}")
-                    
-                    # Save updated database
-                    master_db.to_parquet(master_path)
-                    print(f"Saved updated master database to {master_path}")
-                except Exception as e:
-                    print(f"Error updating existing database: {str(e)}")
-                    print("Falling back to rebuilding database from scratch")
-                    incremental = False
-            else:
-                print(f"No new data to add. Skipped {skipped_files} existing files.")
-            
-            return master_db
-            
-        except Exception as e:
-            print(f"Error updating existing database: {str(e)}")
-            print("Falling back to rebuilding database from scratch")
-            incremental = False
-    
-    # Build new database from scratch if needed
-    if not incremental or not os.path.exists(master_path):
+
+    if not incremental:
         print("Building new master database from scratch")
-        
-        all_dfs = []
-        processed = 0
-        errors = 0
-        
-        for file_path, date_info in all_files:
+        shutil.rmtree(master_path, ignore_errors=True)
+        manifest = load_manifest(output_dir, master_name).iloc[:0]
+    else:
+        # Databases built before the manifest existed were a single Parquet file
+        legacy_path = os.path.join(output_dir, f'{master_name}.parquet')
+        if os.path.isfile(legacy_path) and not os.path.isdir(master_path):
+            print(f"Importing existing master database: {legacy_path}")
             try:
-                print(f"Processing {date_info}...")
-                df = pd.read_parquet(file_path)
-                
-                # Skip if empty
-                if df.empty:
-                    print(f"Skipping empty file: {date_info}")
-                    continue
-                
-                # Apply run_type filter again at the dataframe level as a failsafe
-                if run_type_filter and 'run_type' in df.columns:
-                    df = df[df['run_type'] == run_type_filter]
-                    if df.empty:
-                        print(f"Skipping file after filtering: {date_info}")
-                        continue
-                
-                # Ensure essential columns exist
-                if 'trading_date' not in df.columns:
-                    # Try to extract date from path
-                    parts = date_info.split('/')
-                    if len(parts) >= 3:
-                        year, month, day = parts[-5], parts[-4], parts[-2]
-                        df['trading_date'] = f"{year}-{month}-{day}"
-                
-                all_dfs.append(df)
-                processed += 1
-                
-                # Periodically save progress for very large datasets
-                if processed % 50 == 0:
-                    print(f"Processed {processed}/{len(all_files)} files...")
-                
+                imported = import_legacy_master(legacy_path, base_dir, output_dir, master_name, run_type_filter)
+                print(f"Imported {imported} runs from {legacy_path}")
             except Exception as e:
-                print(f"Error processing {date_info}: {str(e)}")
-                errors += 1
-        
-        # Combine all dataframes
-        if all_dfs:
-            master_db = pd.concat(all_dfs, ignore_index=True)
-            
-            # Convert date columns to appropriate types
-            date_columns = ['trading_date', 'expiration']
-            for col in date_columns:
-                if col in master_db.columns:
-                    try:
-                        master_db[col] = pd.to_datetime(master_db[col])
-                    except:
-                        print(f"Warning: Could not convert {col} to datetime")
-            
-            # Add derived columns for analysis
-            try:
-                # Calculate days-to-expiration for each option at time of recording
-                if 'trading_date' in master_db.columns and 'expiration' in master_db.columns:
-                    master_db['days_to_expiry'] = (
-                        pd.to_datetime(master_db['expiration']) - 
-                        pd.to_datetime(master_db['trading_date'])
-                    ).dt.days
-                
-                # Calculate moneyness
-                if 'strike' in master_db.columns and 'underlying_price' in master_db.columns:
-                    master_db['moneyness'] = master_db['strike'] / master_db['underlying_price']
-            except Exception as e:
-                print(f"Warning: Error calculating derived columns: {str(e)}")
-            
-            # Save the master database
-            master_db.to_parquet(master_path)
-            print(f"Successfully built master database with {len(master_db):,} rows")
-            print(f"Saved to {master_path}")
-            print(f"Processed {processed} files with {errors} errors")
-            
-            return master_db
-        else:
-            print(f"No valid data found in {len(all_files)} files")
-            return None
+                print(f"Error importing {legacy_path}: {str(e)}")
+
+        manifest = load_manifest(output_dir, master_name)
+
+    # Only files that are new or changed since they were last imported get opened
+    new_files = []
+    skipped_files = 0
+    for file_path, path_info, trading_date, run_type in all_files:
+        stat = os.stat(file_path)
+        if file_path in manifest.index:
+            entry = manifest.loc[file_path]
+            if entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                skipped_files += 1
+                continue
+        new_files.append((file_path, path_info, trading_date, run_type, stat))
+
+    if not new_files:
+        print(f"No new data to add. Skipped {skipped_files} existing files.")
+        return master_path
+
+    print(f"Adding {len(new_files)} new files to master database (skipped {skipped_files} existing files)")
+    processed = 0
+    total_rows = 0
+
+    # Bounded batches keep a full rebuild over months of history within memory
+    for start in range(0, len(new_files), INGEST_BATCH_FILES):
+        batch = new_files[start:start + INGEST_BATCH_FILES]
+        table, row_counts = read_raw_files([f[:4] for f in batch], run_type_filter, max_workers)
+        if table is not None and table.num_rows:
+            write_snapshot_runs(table, master_name, base_dir=output_dir)
+
+        # A re-imported file with no rows left must not keep its earlier partition
+        for file_path, _, trading_date, run_type, _ in batch:
+            if row_counts.get(file_path) == 0:
+                shutil.rmtree(os.path.join(master_path, f"date={trading_date.date().isoformat()}",
+                                           f"run_type={run_type}"), ignore_errors=True)
+
+        for file_path, _, trading_date, run_type, stat in batch:
+            if file_path not in row_counts:
+                continue
+            manifest.loc[file_path] = {
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'num_rows': row_counts[file_path],
+                'trading_date': trading_date,
+                'run_type': run_type,
+            }
+        processed += len(row_counts)
+        total_rows += sum(row_counts.values())
+        save_manifest(manifest, output_dir, master_name)
+        print(f"Processed {processed}/{len(new_files)} files...")
+
+    print(f"Added {total_rows:,} rows to {master_path}")
+    print(f"Processed {processed} files with {len(new_files) - processed} errors")
+    return master_path
+
+def build_options_master_database(
+    base_dir='options_data',
+    output_dir='options_db',
+    master_file='options_master.parquet',
+    run_type_filter='evening',  # Added parameter to filter by run_type
+    incremental=True,
+    max_workers=DEFAULT_INGEST_WORKERS
+):
+    """
+    Build or update a master database from raw options parquet files in nested directories.
+
+    Kept for existing callers: updates the master with update_options_master
+    and loads all of it. The master is now a partitioned dataset named after
+    master_file (an existing single-file master of that name is imported
+    once); use update_options_master and load_options_master to avoid
+    loading the whole database.
+
+    Args:
+        base_dir (str): Base directory containing the nested folder structure
+        output_dir (str): Directory to store the master database
+        master_file (str): Filename of the master database (its stem names the dataset)
+        run_type_filter (str): Filter to only include specific run_type ('evening', 'morning', or None for all)
+        incremental (bool): If True, update existing database; if False, rebuild from scratch
+        max_workers (int): Number of raw files read concurrently
+
+    Returns:
+        pd.DataFrame: The master database, or None if it holds no data
+    """
+    master_name = os.path.splitext(master_file)[0]
+    update_options_master(base_dir, output_dir, master_name, run_type_filter, incremental, max_workers)
+    master_db = load_options_master(output_dir, master_name)
+    return master_db if not master_db.empty else None
+
+def load_options_master(output_dir='options_db', master_name='options_master', **filters):
+    """
+    Load rows from the master database
+
+    Args:
+        output_dir (str): Directory holding the master database
+        master_name (str): Name of the master dataset
+        **filters: tickers, start_date, end_date, run_types, columns or
+            as_table, passed to snapshot_dataset.load_snapshots
+
+    Returns:
+        pd.DataFrame: Matching rows of the master database
+    """
+    return load_snapshots(master_name, base_dir=output_dir, **filters)
 
 # Add this part to execute when the script is run directly
 if __name__ == "__main__":
     # Adjust these paths to match your system
-    master_df = build_options_master_database(
+    master_path = update_options_master(
         base_dir='options_data',     # Path to your nested options data
         output_dir='/Users/studio/Documents/options_database',     # Where to save the master database
         run_type_filter='evening',   # Only include evening data
         incremental=True             # Update existing or create new
-    )
\ No newline at end of file
+    )
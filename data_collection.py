@@ -3,19 +3,52 @@
 import os
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import yfinance as yf
 from datetime import datetime
 import time
 import random
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 
 from gamma_analysis import calculate_gamma_flip
+from rate_limiter import rate_limiter
+from schema_registry import RAW_OPTIONS_SCHEMA, conform_to_schema
+from utils import days_to_expiry, contract_ids
+
+try:
+    from yfinance.exceptions import YFRateLimitError
+except ImportError:  # older yfinance releases
+    YFRateLimitError = ()
+
+def is_rate_limit_error(e):
+    """
+    Check whether an exception means Yahoo throttled the request (HTTP 429)
+    
+    Args:
+        e (Exception): Exception raised by a yfinance call
+        
+    Returns:
+        bool: True for YFRateLimitError or an HTTP 429 response
+    """
+    if isinstance(e, YFRateLimitError):
+        return True
+    response = getattr(e, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        return True
+    return 'Too Many Requests' in str(e)
 
 # Add the retry decorator
 def retry_with_backoff(retries=5, backoff_factor=0.5, errors=(Exception,)):
     """
     Retry decorator with exponential backoff
     
+    Network errors and throttling responses are reported to the shared rate
+    limiter so that a burst of them slows down all workers, not just the one
+    retrying. Other errors (empty chains, tickers without data) are retried
+    without touching the limiter.
+    
     Args:
         retries: Number of times to retry
         backoff_factor: How much to backoff (exponentially)
@@ -27,8 +60,14 @@ def retry_with_backoff(retries=5, backoff_factor=0.5, errors=(Exception,)):
             x = 0
             while True:
                 try:
-                    return f(*args, **kwargs)
+                    result = f(*args, **kwargs)
+                    rate_limiter.record_success()
+                    return result
                 except errors as e:
+                    # requests/curl_cffi connection and timeout errors are OSErrors
+                    throttled = is_rate_limit_error(e)
+                    if throttled or isinstance(e, OSError):
+                        rate_limiter.record_error(throttled=throttled)
                     if x == retries:
                         raise
                     
@@ -40,12 +79,35 @@ def retry_with_backoff(retries=5, backoff_factor=0.5, errors=(Exception,)):
         return wrapper
     return decorator
 
+def price_snapshot_from_history(hist):
+    """
+    Build a price snapshot from a daily price history
+    
+    Args:
+        hist (DataFrame): Price history with a 'Close' column, oldest row first
+        
+    Returns:
+        dict: {'spot', 'prev_close'} or None if the history is empty
+    """
+    closes = hist['Close'].dropna() if not hist.empty else hist
+    if closes.empty:
+        return None
+    
+    return {
+        'spot': closes.iloc[-1],
+        'prev_close': closes.iloc[-2] if len(closes) > 1 else None
+    }
+
 # Helper function with retry for fetching ticker data
 @retry_with_backoff(retries=5, backoff_factor=1.5, errors=(Exception,))
 def fetch_ticker_data(ticker):
     """
     Fetch ticker data with retry logic
     
+    The two-day price history used to validate the ticker also provides spot
+    and previous close, so it is cached on the ticker object as
+    `price_snapshot` for fetch_price_snapshot to reuse.
+    
     Args:
         ticker (str): The ticker symbol
         
@@ -55,12 +117,14 @@ def fetch_ticker_data(ticker):
     try:
         ticker_obj = yf.Ticker(ticker)
         
-        # Test that we can actually get data from this ticker
-        # by fetching a small amount of history
-        test_hist = ticker_obj.history(period="1d")
-        if test_hist.empty:
+        rate_limiter.acquire()
+        # Test that we can actually get data from this ticker while
+        # fetching the prices we need anyway
+        snapshot = price_snapshot_from_history(ticker_obj.history(period="2d"))
+        if snapshot is None:
             raise Exception(f"No data available for ticker {ticker}")
-            
+        
+        ticker_obj.price_snapshot = snapshot
         return ticker_obj
     except Exception as e:
         print(f"Failed to get ticker '{ticker}' reason: {str(e)}")
@@ -78,8 +142,39 @@ def fetch_ticker_history(ticker_obj, period="2d"):
     Returns:
         DataFrame: Price history
     """
+    rate_limiter.acquire()
     return ticker_obj.history(period=period)
 
+def fetch_price_snapshot(ticker_obj):
+    """
+    Get spot and previous close for a ticker, fetching only if not cached
+    
+    Args:
+        ticker_obj: yfinance.Ticker object
+        
+    Returns:
+        dict: {'spot', 'prev_close'} or None if no price data is available
+    """
+    snapshot = getattr(ticker_obj, 'price_snapshot', None)
+    if snapshot is None:
+        snapshot = price_snapshot_from_history(fetch_ticker_history(ticker_obj, period="2d"))
+        ticker_obj.price_snapshot = snapshot
+    return snapshot
+
+@retry_with_backoff(retries=3, backoff_factor=1, errors=(Exception,))
+def fetch_option_expiries(ticker_obj):
+    """
+    Fetch the list of option expiry dates with retry logic
+    
+    Args:
+        ticker_obj: yfinance.Ticker object
+        
+    Returns:
+        tuple: Expiry date strings
+    """
+    rate_limiter.acquire()
+    return ticker_obj.options
+
 @retry_with_backoff(retries=3, backoff_factor=1, errors=(Exception,))
 def fetch_option_chain(ticker_obj, expiry):
     """
@@ -92,11 +187,165 @@ def fetch_option_chain(ticker_obj, expiry):
     Returns:
         tuple: (calls, puts) DataFrames
     """
+    rate_limiter.acquire()
     opt = ticker_obj.option_chain(expiry)
     return opt.calls, opt.puts
 
+def fetch_option_chains(ticker_obj, expiries, max_workers=1):
+    """
+    Fetch option chains for several expiries, optionally in parallel
+    
+    Requests still go through the shared rate limiter, so parallel fetching
+    only overlaps network latency and never exceeds the global request rate.
+    
+    Args:
+        ticker_obj: yfinance.Ticker object
+        expiries (list): Option expiry dates
+        max_workers (int): Number of expiries fetched concurrently (1 = sequential)
+        
+    Returns:
+        list: (calls, puts) tuples in the same order as expiries
+    """
+    if max_workers <= 1 or len(expiries) <= 1:
+        return [fetch_option_chain(ticker_obj, exp) for exp in expiries]
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(expiries))) as executor:
+        return list(executor.map(lambda exp: fetch_option_chain(ticker_obj, exp), expiries))
+
+@retry_with_backoff(retries=3, backoff_factor=1, errors=(Exception,))
+def fetch_price_history_batch(tickers, period="2d"):
+    """
+    Fetch daily price history for several tickers in one request with retry logic
+    
+    Args:
+        tickers (list): Ticker symbols
+        period (str): Period to fetch
+        
+    Returns:
+        DataFrame: Price history with (ticker, field) MultiIndex columns
+    """
+    rate_limiter.acquire()
+    return yf.download(tickers, period=period, group_by='ticker', auto_adjust=True,
+                       threads=False, progress=False)
+
+def fetch_bulk_price_snapshots(tickers, chunk_size=100):
+    """
+    Fetch spot and previous close for a whole ticker universe in batched requests
+    
+    Tickers missing from the result (download errors, delisted symbols) are
+    simply left out; process_ticker falls back to fetching them individually.
+    
+    Args:
+        tickers (list): Ticker symbols
+        chunk_size (int): Number of tickers per multi-symbol request
+        
+    Returns:
+        dict: ticker -> {'spot', 'prev_close'}
+    """
+    snapshots = {}
+    
+    for i in range(0, len(tickers), chunk_size):
+        chunk = list(dict.fromkeys(tickers[i:i+chunk_size]))
+        try:
+            hist = fetch_price_history_batch(chunk)
+        except Exception as e:
+            print(f"Error downloading prices for batch {i//chunk_size + 1}: {e}")
+            continue
+        
+        if hist is None or hist.empty:
+            continue
+        
+        for ticker in chunk:
+            if isinstance(hist.columns, pd.MultiIndex):
+                if ticker not in hist.columns.get_level_values(0):
+                    continue
+                ticker_hist = hist[ticker]
+            elif len(chunk) == 1:
+                ticker_hist = hist
+            else:
+                continue
+            
+            snapshot = price_snapshot_from_history(ticker_hist)
+            if snapshot is not None:
+                snapshots[ticker] = snapshot
+    
+    return snapshots
+
+def build_price_data(ticker, snapshot, trading_date):
+    """
+    Build the per-ticker price record saved to price_data.parquet
+    
+    Args:
+        ticker (str): The ticker symbol
+        snapshot (dict): {'spot', 'prev_close'} price snapshot
+        trading_date (datetime): Trading session date
+        
+    Returns:
+        dict: Price data record
+    """
+    spot = snapshot['spot']
+    prev_close = snapshot['prev_close']
+    return {
+        'ticker': ticker,
+        'current_price': spot,
+        'prev_close': prev_close if prev_close is not None else None,
+        'price_change_pct': ((spot - prev_close) / prev_close * 100) if prev_close is not None else None,
+        'trading_date': trading_date.strftime('%Y-%m-%d'),
+        'timestamp': datetime.now().strftime('%H:%M:%S')
+    }
+
+def build_chain_frame(ticker, expiries, chains, price, trading_date):
+    """
+    Stack a ticker's option chains into one normalized frame
+    
+    Calls and puts for every expiry are concatenated once, then the
+    option_type, expiration, dte, moneyness and contract_id columns are added
+    as whole columns rather than per chain.
+    
+    Args:
+        ticker (str): The ticker symbol
+        expiries (list): Option expiry dates
+        chains (list): (calls, puts) tuples aligned with expiries
+        price (float): Underlying price used for moneyness
+        trading_date (datetime): Trading session date used for dte
+        
+    Returns:
+        DataFrame: Normalized chain frame, or None if every chain is empty
+    """
+    parts, option_types, expirations = [], [], []
+    
+    for exp, (calls, puts) in zip(expiries, chains):
+        # Additional check to ensure both calls and puts are valid
+        if calls is None or puts is None:
+            print(f"Warning: Received None for calls or puts for {ticker} {exp}")
+            continue
+        
+        for chain, option_type in ((calls, 'call'), (puts, 'put')):
+            if not chain.empty:
+                parts.append(chain)
+                option_types.append(option_type)
+                expirations.append(exp)
+    
+    if not parts:
+        return None
+    
+    lengths = [len(part) for part in parts]
+    chain_df = pd.concat(parts, ignore_index=True)
+    chain_df['option_type'] = pd.Categorical(np.repeat(option_types, lengths), categories=OPTION_TYPES)
+    chain_df['expiration'] = pd.Categorical(np.repeat(expirations, lengths))
+    
+    # Days to expiry is computed once per expiry and broadcast to its rows
+    chain_df['dte'] = days_to_expiry(chain_df['expiration'], trading_date, business_days=False)
+    chain_df['moneyness'] = chain_df['strike'] / price
+    
+    # Integer key used to join snapshots (see utils.contract_ids)
+    if 'contractSymbol' in chain_df.columns:
+        chain_df['contract_id'] = contract_ids(chain_df['contractSymbol'])
+    
+    return chain_df
+
 # Now modify the process_ticker function to use these retry-enabled functions
-def process_ticker(ticker, index=None, total=None, run_gamma=True, run_vol=True, collect_raw=True, trading_date=None, utils_module=None):
+def process_ticker(ticker, index=None, total=None, run_gamma=True, run_vol=True, collect_raw=True, trading_date=None, utils_module=None, expiry_workers=1, price_snapshot=None):
     """
     Process a single ticker to collect gamma flip and volatility surface data
     
@@ -109,6 +358,9 @@ def process_ticker(ticker, index=None, total=None, run_gamma=True, run_vol=True,
         collect_raw (bool): Whether to collect and return raw options data
         trading_date (datetime, optional): Trading session date
         utils_module (module, optional): Utils module to use (for testing)
+        expiry_workers (int, optional): Number of expiries fetched concurrently
+        price_snapshot (dict, optional): Pre-fetched {'spot', 'prev_close'} from
+            fetch_bulk_price_snapshots; skips the per-ticker price request
         
     Returns:
         tuple: (gamma_result, vol_surface_df, raw_data, price_data)
@@ -126,36 +378,36 @@ def process_ticker(ticker, index=None, total=None, run_gamma=True, run_vol=True,
         trading_date = datetime.now()
     
     try:
-        # Fetch data once from yfinance API with retry
-        try:
-            data = fetch_ticker_data(ticker)
-        except Exception as e:
-            print(f"Error processing {ticker}: {e}")
-            return None, None, None, None
+        # Statistical tickers only need prices, so a bulk snapshot saves
+        # every request for them
+        if price_snapshot is not None and ticker in STATISTICAL_TICKERS:
+            print(f"{ticker} is a statistical indicator - skipping options analysis")
+            return None, None, None, build_price_data(ticker, price_snapshot, trading_date)
+        
+        if price_snapshot is not None:
+            # Prices already fetched in bulk, which also proves the ticker is valid
+            data = yf.Ticker(ticker)
+            data.price_snapshot = price_snapshot
+        else:
+            # Fetch data once from yfinance API with retry
+            try:
+                data = fetch_ticker_data(ticker)
+            except Exception as e:
+                print(f"Error processing {ticker}: {e}")
+                return None, None, None, None
                     
-        # Get spot price with retry
-        hist = fetch_ticker_history(data, period="2d")
-        if hist.empty:
+        # Get spot price and previous close (cached by fetch_ticker_data)
+        snapshot = fetch_price_snapshot(data)
+        if snapshot is None:
             print(f"No price data for {ticker}")
             return None, None, None, None
             
-        spot = hist['Close'].iloc[-1]
+        spot = snapshot['spot']
         price = spot
-        
-        # Get previous day close if available
-        prev_close = None
-        if len(hist) > 1:
-            prev_close = hist['Close'].iloc[-2]
+        prev_close = snapshot['prev_close']
         
         # Create price data dictionary
-        price_data = {
-            'ticker': ticker,
-            'current_price': spot,
-            'prev_close': prev_close if prev_close is not None else None,
-            'price_change_pct': ((spot - prev_close) / prev_close * 100) if prev_close is not None else None,
-            'trading_date': trading_date.strftime('%Y-%m-%d'),
-            'timestamp': datetime.now().strftime('%H:%M:%S')
-        }
+        price_data = build_price_data(ticker, snapshot, trading_date)
         
         # For statistical tickers, we're done - just return the price data
         if ticker in STATISTICAL_TICKERS:
@@ -163,116 +415,68 @@ def process_ticker(ticker, index=None, total=None, run_gamma=True, run_vol=True,
             return None, None, None, price_data
         
         # For regular tickers, continue with options processing
-        expiries = data.options
+        expiries = fetch_option_expiries(data)
         if not expiries:
             print(f"No options data for {ticker}")
             return None, None, None, price_data  # Still return price data even if no options
         
+        # Fetch every option chain with retry; results come back in expiry order
+        try:
+            chains = fetch_option_chains(data, expiries, max_workers=expiry_workers)
+        except Exception as e:
+            print(f"Error processing {ticker}: {e}")
+            return None, None, None, None
+        
+        # Build one normalized chain frame for the ticker; gamma, vol surface
+        # and raw storage all read from it instead of taking their own copies
+        chain_df = build_chain_frame(ticker, expiries, chains, price, trading_date)
+        if chain_df is None:
+            print(f"No option chains for {ticker}")
+            return None, None, None, price_data
+        
         # Raw data collection
         raw_data = None
         if collect_raw:
-            raw_data = {ticker: {}}
+            raw_data = {ticker: {
+                'chain': chain_df,
+                'spot': spot,
+                'prev_close': prev_close,
+                'trading_date': trading_date.strftime('%Y-%m-%d')
+            }}
             
         # === PART 1: Gamma Flip Calculation ===
         gamma_result = None
-        all_options = []
-        
-        for exp in expiries:
-            try:
-                # Fetch option chain with retry
-                calls, puts = fetch_option_chain(data, exp)
-                
-                # Additional check to ensure both calls and puts are valid
-                if calls is None or puts is None:
-                    print(f"Warning: Received None for calls or puts for {ticker} {exp}")
-                    continue
-                
-                # Store raw data if requested
-                if collect_raw:
-                    raw_data[ticker][exp] = {
-                        'calls': calls.copy() if calls is not None else pd.DataFrame(),
-                        'puts': puts.copy() if puts is not None else pd.DataFrame(),
-                        'spot': spot,
-                        'prev_close': prev_close,
-                        'trading_date': trading_date.strftime('%Y-%m-%d')  # Add trading date
-                    }
-                
-                if not calls.empty and not puts.empty:
-                    calls_copy = calls.copy()
-                    puts_copy = puts.copy()
-                    calls_copy['ExpirationDate'] = pd.to_datetime(exp)
-                    puts_copy['ExpirationDate'] = pd.to_datetime(exp)
-                    all_options.append((calls_copy, puts_copy))
-            except Exception as e:
-                print(f"Error processing {ticker}: {e}")
-                return None, None, None, None
-        
-        if run_gamma and all_options:
+        if run_gamma:
             fromStrike, toStrike = 0.5 * spot, 2.0 * spot
             today = pd.Timestamp.today().date()
-            gamma_result = calculate_gamma_flip(ticker, all_options, spot, fromStrike, toStrike, today)
+            gamma_result = calculate_gamma_flip(ticker, chain_df, spot, fromStrike, toStrike, today)
         
         # === PART 2: Volatility Surface ===
         vol_surface_df = None
         if run_vol:
-            vol_surface_data = []
-            
-            for exp in expiries:
-                try:
-                    # We already fetched the option chain above, so reuse it from raw_data if available
-                    if collect_raw and exp in raw_data[ticker]:
-                        calls = raw_data[ticker][exp]['calls']
-                        puts = raw_data[ticker][exp]['puts']
-                    else:
-                        # If not available, fetch it again with retry
-                        calls, puts = fetch_option_chain(data, exp)
-                        
-                        # Check for None values
-                        if calls is None or puts is None:
-                            print(f"Warning: Received None for calls or puts for {ticker} {exp} in vol analysis")
-                            continue
-                    
-                    exp_date = datetime.strptime(exp, '%Y-%m-%d')
-                    dte = (exp_date - trading_date).days
-                    
-                    if dte < 0:
-                        continue
-                    
-                    if not calls.empty:
-                        calls_vs = calls.copy()
-                        calls_vs['option_type'] = 'call'
-                        calls_vs['expiration'] = exp
-                        calls_vs['dte'] = dte
-                        calls_vs['moneyness'] = calls_vs['strike'] / price
-                        vol_surface_data.append(calls_vs)
-                    
-                    if not puts.empty:
-                        puts_vs = puts.copy()
-                        puts_vs['option_type'] = 'put'
-                        puts_vs['expiration'] = exp
-                        puts_vs['dte'] = dte
-                        puts_vs['moneyness'] = puts_vs['strike'] / price
-                        vol_surface_data.append(puts_vs)
-                    
-                except Exception as e:
-                    print(f"Error with vol surface for {ticker} {exp}: {e}")
-                    continue
+            expired = chain_df['dte'] < 0
+            vol_surface_df = chain_df.loc[~expired] if expired.any() else chain_df
             
-            if vol_surface_data:
-                # Handle empty DataFrames properly to avoid FutureWarning
-                non_empty_data = [df for df in vol_surface_data if not df.empty]
-                if non_empty_data:
-                    vol_surface_df = pd.concat(non_empty_data)
-                    vol_surface_df['date'] = trading_date.strftime('%Y-%m-%d')
-                    vol_surface_df['timestamp'] = datetime.now().strftime('%H:%M:%S')
-                    vol_surface_df['trading_date'] = trading_date.strftime('%Y-%m-%d')
-                    vol_surface_df['underlying_price'] = price
-                    vol_surface_df['ticker'] = ticker
-                    
-                    # Add previous day close if available
-                    if prev_close is not None:
-                        vol_surface_df['prev_close'] = prev_close
-                        vol_surface_df['price_change_pct'] = (price - prev_close) / prev_close * 100
+            if vol_surface_df.empty:
+                vol_surface_df = None
+            else:
+                # assign builds a new frame, so chain_df (also used for raw_data)
+                # is never modified and the filtered view is never written to
+                num_rows = len(vol_surface_df)
+                surface_columns = {
+                    'date': constant_category(trading_date.strftime('%Y-%m-%d'), num_rows),
+                    'timestamp': constant_category(datetime.now().strftime('%H:%M:%S'), num_rows),
+                    'trading_date': constant_category(trading_date.strftime('%Y-%m-%d'), num_rows),
+                    'underlying_price': price,
+                    'ticker': constant_category(ticker, num_rows),
+                }
+                
+                # Add previous day close if available
+                if prev_close is not None:
+                    surface_columns['prev_close'] = prev_close
+                    surface_columns['price_change_pct'] = (price - prev_close) / prev_close * 100
+                
+                vol_surface_df = vol_surface_df.assign(**surface_columns)
         
         return gamma_result, vol_surface_df, raw_data, price_data
         
@@ -280,9 +484,65 @@ def process_ticker(ticker, index=None, total=None, run_gamma=True, run_vol=True,
         print(f"Error processing {ticker}: {e}")
         return None, None, None, None
 
+# Compact dtypes shared by the vol surface and raw options snapshots
+OPTION_TYPES = ['call', 'put']
+
+# Low-cardinality strings (mostly constant per ticker or per run) become
+# categoricals, which Parquet stores dictionary-encoded
+CATEGORY_COLUMNS = ['ticker', 'option_type', 'expiration', 'run_type', 'timestamp', 'currency', 'contractSize']
+
+# Per-run dates are stored as dates instead of 'YYYY-MM-DD' strings
+DATE_COLUMNS = ['date', 'trading_date']
+
+# Ratios, volatilities, counts and Greeks need far less than float64 precision;
+# prices and strikes (join keys, mid-price inputs) stay float64
+FLOAT32_COLUMNS = [
+    'impliedVolatility', 'mid_iv', 'change', 'percentChange', 'volume', 'openInterest',
+    'moneyness', 'price_change_pct', 'time_to_expiry',
+    'delta', 'gamma', 'vega', 'theta', 'vanna', 'charm',
+]
+
+def constant_category(value, length):
+    """
+    Categorical column holding the same value on every row
+    
+    Args:
+        value (str): The value
+        length (int): Number of rows
+        
+    Returns:
+        Categorical: One category, int8 codes
+    """
+    return pd.Categorical.from_codes(np.zeros(length, dtype=np.int8), categories=[value])
+
+def apply_snapshot_schema(df):
+    """
+    Convert a snapshot frame to the compact dtypes in place
+    
+    Args:
+        df (DataFrame): Vol surface or raw options frame
+        
+    Returns:
+        DataFrame: The same frame with categorical, date and float32 columns
+    """
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col].astype(str))
+    
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns and df[col].dtype != np.float32:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float32)
+    
+    return df
+
 def prepare_for_parquet(df):
     """
-    Fix dataframe columns for parquet compatibility
+    Fix dataframe columns for parquet compatibility and apply the compact
+    snapshot dtypes (see apply_snapshot_schema)
     
     Args:
         df (DataFrame): Raw dataframe
@@ -304,14 +564,120 @@ def prepare_for_parquet(df):
                 # If conversion fails, keep the column as is
                 pass
     
-    return df
+    # Categoricals, dates and float32 where precision allows
+    return apply_snapshot_schema(df)
+
+class RawOptionsWriter:
+    """
+    Stream raw options data to Parquet one ticker (row group) at a time
+    
+    Every ticker is conformed to RAW_OPTIONS_SCHEMA and written as soon as
+    it arrives, so memory use stays flat regardless of the universe size.
+    The file is written under a temporary name and moved into place on
+    close, so a crashed run never leaves a truncated raw_options.parquet.
+    
+    Args:
+        filepath (str): Destination parquet file
+        timestamp (str): Timestamp string stored with every row
+        run_type (str): 'morning' or 'evening'
+        trading_date (datetime, optional): Trading session date
+    """
+    def __init__(self, filepath, timestamp, run_type, trading_date=None):
+        if trading_date is None:
+            trading_date = datetime.now()
+        
+        self.filepath = filepath
+        self.timestamp = timestamp
+        self.run_type = run_type
+        self.trading_date = trading_date.date() if isinstance(trading_date, datetime) else trading_date
+        self.rows_written = 0
+        self._tmp_path = filepath + '.tmp'
+        self._writer = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+    
+    def write_ticker(self, ticker, chain_df, spot=None, prev_close=None):
+        """
+        Append one ticker's normalized chain frame as a single row group
+        
+        The frame is read as-is: only the schema columns are converted to
+        Arrow and the per-ticker constants are added as Arrow columns, so no
+        pandas copy of the chain is made.
+        
+        Args:
+            ticker (str): The ticker symbol
+            chain_df (DataFrame): Chain frame from build_chain_frame
+            spot (float, optional): Underlying price
+            prev_close (float, optional): Previous close
+            
+        Returns:
+            int: Number of rows written
+        """
+        if chain_df is None or chain_df.empty:
+            return 0
+        
+        num_rows = len(chain_df)
+        constants = {
+            'ticker': ticker,
+            'timestamp': self.timestamp,
+            'run_type': self.run_type,
+            'trading_date': self.trading_date,
+            'underlying_price': spot,
+            'prev_close': prev_close,
+        }
+        
+        # Missing constants and columns are left to conform_to_schema as nulls
+        columns = {
+            name: pa.repeat(pa.scalar(value, RAW_OPTIONS_SCHEMA.field(name).type), num_rows)
+            for name, value in constants.items() if value is not None and not pd.isna(value)
+        }
+        for name in RAW_OPTIONS_SCHEMA.names:
+            if name not in constants and name in chain_df.columns:
+                columns[name] = chain_df[name]
+        
+        table = conform_to_schema(columns, num_rows)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._tmp_path, RAW_OPTIONS_SCHEMA)
+        self._writer.write_table(table)
+        self.rows_written += num_rows
+        return num_rows
+    
+    def close(self):
+        """
+        Finish the file and move it into place
+        
+        Returns:
+            str: Path to the saved file, or None if nothing was written
+        """
+        if self._writer is None:
+            return self.filepath if self.rows_written else None
+        self._writer.close()
+        self._writer = None
+        os.replace(self._tmp_path, self.filepath)
+        return self.filepath
+    
+    def abort(self):
+        """Discard a partially written file"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
 
 def save_raw_options_data(ticker_data, timestamp, run_type, trading_date=None, test_mode=False):
     """
     Save raw options data before any processing
     
     Args:
-        ticker_data (dict): Dictionary containing raw options data by ticker
+        ticker_data (dict): ticker -> {'chain', 'spot', 'prev_close'} as returned
+            in process_ticker's raw_data
         timestamp (str): Timestamp string for the filename
         run_type (str): 'morning' or 'evening'
         trading_date (datetime, optional): Trading session date
@@ -320,58 +686,17 @@ def save_raw_options_data(ticker_data, timestamp, run_type, trading_date=None, t
     Returns:
         str: Path to the saved file
     """
-    # Create a DataFrame from the raw data
-    raw_data = []
-    
     # Use provided trading_date or current date
     if trading_date is None:
         trading_date = datetime.now()
-        
-    trading_date_str = trading_date.strftime('%Y-%m-%d')
-    
-    for ticker, data in ticker_data.items():
-        for exp_date, options in data.items():
-            if 'calls' in options and not options['calls'].empty:
-                df_calls = options['calls'].copy()
-                df_calls['ticker'] = ticker
-                df_calls['expiration'] = exp_date
-                df_calls['option_type'] = 'call'
-                df_calls['timestamp'] = timestamp
-                df_calls['run_type'] = run_type
-                df_calls['trading_date'] = trading_date_str  # Add the trading date explicitly
-                df_calls['underlying_price'] = options.get('spot', None)
-                df_calls['prev_close'] = options.get('prev_close', None)
-                raw_data.append(df_calls)
-            
-            if 'puts' in options and not options['puts'].empty:
-                df_puts = options['puts'].copy()
-                df_puts['ticker'] = ticker
-                df_puts['expiration'] = exp_date
-                df_puts['option_type'] = 'put'
-                df_puts['timestamp'] = timestamp
-                df_puts['run_type'] = run_type
-                df_puts['trading_date'] = trading_date_str  # Add the trading date explicitly
-                df_puts['underlying_price'] = options.get('spot', None)
-                df_puts['prev_close'] = options.get('prev_close', None)
-                raw_data.append(df_puts)
-    
-    # Combine all data and prepare for parquet
-    if raw_data:
-        if all(not df.empty for df in raw_data):  # Check that we have non-empty DataFrames
-            combined_df = pd.concat(raw_data)
-            combined_df = prepare_for_parquet(combined_df)
-            
-            # Get the nested folder path
-            from main import get_nested_folder_path
-            folder_info = get_nested_folder_path(trading_date, run_type, test_mode=test_mode)
-            folder_path = folder_info['path']
-            
-            # Save to parquet in the nested folder structure
-            filepath = os.path.join(folder_path, 'raw_options.parquet')
-            combined_df.to_parquet(filepath)
-            return filepath
-        else:
-            print("Warning: Some DataFrames were empty, skipping concatenation")
-            return None
-        
-    return None
\ No newline at end of file
+    
+    # Get the nested folder path
+    from main import get_nested_folder_path
+    folder_info = get_nested_folder_path(trading_date, run_type, test_mode=test_mode)
+    filepath = os.path.join(folder_info['path'], 'raw_options.parquet')
+    
+    with RawOptionsWriter(filepath, timestamp, run_type, trading_date) as writer:
+        for ticker, data in ticker_data.items():
+            writer.write_ticker(ticker, data.get('chain'), data.get('spot'), data.get('prev_close'))
+    
+    return writer.close()
@@ -1,79 +1,230 @@
 # gamma_analysis.py - Contains gamma flip calculations
 
+import os
 import pandas as pd
 import numpy as np
-from scipy.stats import norm
+from scipy.optimize import brentq
 
-def calculate_gamma_flip(ticker, all_options, spot, fromStrike, toStrike, today):
+from greeks import bs_gamma
+from utils import time_to_expiry
+
+# 'grid' interpolates between 30 evenly spaced levels; 'adaptive' brackets the
+# sign changes with a coarse scan and solves each one exactly
+DEFAULT_FLIP_METHOD = os.environ.get('GAMMA_FLIP_METHOD', 'grid')
+
+def calc_gamma_exposure(levels, strikes, vols, T, open_interest, r=0, q=0):
+    """
+    Gamma exposure of every contract at every spot level, vectorized
+    
+    Contracts with zero time or zero volatility contribute 0. Rows with
+    missing inputs produce NaN, which callers skip when summing.
+    
+    Args:
+        levels (ndarray): Spot price levels, shape (L,)
+        strikes (ndarray): Strike prices, shape (N,)
+        vols (ndarray): Implied volatilities, shape (N,)
+        T (ndarray): Time to expiry in years, shape (N,)
+        open_interest (ndarray): Open interest, shape (N,)
+        r (float): Risk-free rate
+        q (float): Dividend yield
+        
+    Returns:
+        ndarray: Gamma exposure per level and contract, shape (L, N)
+    """
+    return calc_gamma_exposure_at(np.asarray(levels, dtype=float)[:, None], strikes, vols, T, open_interest, r, q)
+
+def calc_gamma_exposure_at(S, strikes, vols, T, open_interest, r=0, q=0):
+    """
+    Gamma exposure for spot levels that broadcast against the contracts
+    
+    Args:
+        S (ndarray): Spot levels, shape (L, 1) for shared levels or (L, N)
+            for a separate level grid per contract
+        strikes, vols, T, open_interest (ndarray): Contract arrays, shape (N,)
+        r (float): Risk-free rate
+        q (float): Dividend yield
+        
+    Returns:
+        ndarray: Gamma exposure, shape (L, N)
+    """
+    gamma = bs_gamma(S, strikes, T, vols, r, q)
+    with np.errstate(invalid='ignore'):
+        gex = open_interest * 100 * S * S * 0.01 * gamma
+    return np.where((T == 0) | (vols == 0), 0.0, gex)
+
+def net_gamma_exposure(levels, df):
+    """
+    Net dealer gamma exposure (calls minus puts, in billions) at each level
+    
+    Args:
+        levels (array-like): Spot price levels
+        df (DataFrame): Merged call/put frame with StrikePrice, daysTillExp and
+            impliedVolatility/openInterest _call and _put columns
+        
+    Returns:
+        ndarray: Net gamma exposure per level
+    """
+    levels = np.atleast_1d(np.asarray(levels, dtype=float))
+    strikes = df['StrikePrice'].to_numpy(dtype=float)
+    T = df['daysTillExp'].to_numpy(dtype=float)
+    
+    callGEX = calc_gamma_exposure(levels, strikes, df['impliedVolatility_call'].to_numpy(dtype=float),
+                                  T, df['openInterest_call'].to_numpy(dtype=float))
+    putGEX = calc_gamma_exposure(levels, strikes, df['impliedVolatility_put'].to_numpy(dtype=float),
+                                 T, df['openInterest_put'].to_numpy(dtype=float))
+    return (np.nansum(callGEX, axis=1) - np.nansum(putGEX, axis=1)) / 10**9
+
+def flip_scan_levels(fromStrike, toStrike, method='grid', points=30, coarse_points=15):
+    """
+    Levels at which GEX is evaluated before looking for sign changes
+    
+    Args:
+        fromStrike (float): Lower bound of the search range
+        toStrike (float): Upper bound of the search range
+        method (str): 'grid' (evenly spaced) or 'adaptive' (coarse, log-spaced)
+        points (int): Number of levels for the grid method
+        coarse_points (int): Number of levels for the adaptive coarse scan
+        
+    Returns:
+        ndarray: Scan levels
+    """
+    if method == 'grid':
+        return np.linspace(fromStrike, toStrike, points)
+    if method == 'adaptive':
+        return np.geomspace(fromStrike, toStrike, coarse_points)
+    raise ValueError(f"Unknown gamma flip method: {method}")
+
+def crossings_from_profile(levels, totalGamma, method='grid', gex_at=None, xtol=None):
+    """
+    Extract every zero crossing from a scanned GEX profile
+    
+    Args:
+        levels (ndarray): Scan levels from flip_scan_levels
+        totalGamma (ndarray): Net GEX at each level
+        method (str): 'grid' interpolates linearly between levels, 'adaptive'
+            solves each bracketed sign change with brentq on gex_at
+        gex_at (callable, optional): Scalar level -> net GEX, required for 'adaptive'
+        xtol (float, optional): Absolute price tolerance of the adaptive solve,
+            defaults to 0.01% of the lowest level
+        
+    Returns:
+        list: Flip levels in ascending order
+    """
+    zero_crossings = []
+    
+    if method == 'grid':
+        for i in range(len(levels)-1):
+            if (totalGamma[i] * totalGamma[i+1] <= 0):
+                x0, x1 = levels[i], levels[i+1]
+                y0, y1 = totalGamma[i], totalGamma[i+1]
+                if y0 != y1:
+                    zero_crossings.append(x0 - y0 * (x1 - x0) / (y1 - y0))
+        return zero_crossings
+    
+    if xtol is None:
+        xtol = levels[0] * 1e-4
+    
+    for i in range(len(levels)-1):
+        y0, y1 = totalGamma[i], totalGamma[i+1]
+        if y0 == 0:
+            zero_crossings.append(levels[i])
+        elif y0 * y1 < 0:
+            zero_crossings.append(brentq(gex_at, levels[i], levels[i+1], xtol=xtol))
+    if totalGamma[-1] == 0:
+        zero_crossings.append(levels[-1])
+    
+    return zero_crossings
+
+def find_gamma_flips(df, fromStrike, toStrike, method='grid', points=30, coarse_points=15, xtol=None):
+    """
+    Find every level where net gamma exposure changes sign
+    
+    Args:
+        df (DataFrame): Merged call/put frame (see net_gamma_exposure)
+        fromStrike (float): Lower bound of the search range
+        toStrike (float): Upper bound of the search range
+        method (str): 'grid' for linear interpolation on `points` levels,
+            'adaptive' for a coarse scan followed by a bracketed root solve
+        points (int): Number of levels for the grid method
+        coarse_points (int): Number of levels for the adaptive coarse scan
+        xtol (float, optional): Absolute price tolerance of the adaptive solve,
+            defaults to 0.01% of fromStrike
+        
+    Returns:
+        tuple: (crossings, evaluations) - sorted list of flip levels and the
+            number of levels at which GEX was evaluated
+    """
+    levels = flip_scan_levels(fromStrike, toStrike, method, points, coarse_points)
+    totalGamma = net_gamma_exposure(levels, df)
+    evaluations = len(levels)
+    
+    def gex_at(level):
+        nonlocal evaluations
+        evaluations += 1
+        return net_gamma_exposure(level, df)[0]
+    
+    zero_crossings = crossings_from_profile(levels, totalGamma, method, gex_at, xtol)
+    return zero_crossings, evaluations
+
+def format_gamma_output(ticker, strike_calls, strike_puts, gamma_flip):
+    """
+    Format the TradingView string: TICKER:call strikes,put strikes,flip
+    
+    Args:
+        ticker (str): The ticker symbol
+        strike_calls (list): Top call open interest strikes
+        strike_puts (list): Top put open interest strikes
+        gamma_flip (float): Gamma flip level (NaN if none)
+        
+    Returns:
+        str: Formatted output
+    """
+    return f"{ticker}:{','.join(map(lambda x: f'{int(x)}', strike_calls))},{','.join(map(lambda x: f'{int(x)}', strike_puts))},{gamma_flip:.0f}"
+
+def calculate_gamma_flip(ticker, chain_df, spot, fromStrike, toStrike, today, method=None, holidays=None):
     """
     Calculate the gamma flip point and key strike prices for a ticker
     
     Args:
         ticker (str): The ticker symbol
-        all_options (list): List of tuples of (calls, puts) dataframes
+        chain_df (DataFrame): Normalized chain frame with option_type and expiration columns
         spot (float): Current spot price
         fromStrike (float): Lower bound of strike prices to consider
         toStrike (float): Upper bound of strike prices to consider
         today (datetime): Current date
+        method (str, optional): 'grid' or 'adaptive' (see find_gamma_flips),
+            defaults to DEFAULT_FLIP_METHOD
+        holidays (list, optional): Market holidays excluded from time to expiry
         
     Returns:
         str: Formatted string with ticker, key strikes, and gamma flip point
     """
     try:
-        # Prepare dataframes
-        df_calls = pd.concat([opt[0] for opt in all_options], ignore_index=True)
-        df_puts = pd.concat([opt[1] for opt in all_options], ignore_index=True)
-        
-        df_calls = df_calls[(df_calls['strike'] >= fromStrike) & (df_calls['strike'] <= toStrike)]
-        df_puts = df_puts[(df_puts['strike'] >= fromStrike) & (df_puts['strike'] <= toStrike)]
+        # Prepare dataframes - only the columns the GEX calculation needs
+        gamma_columns = ['expiration', 'strike', 'impliedVolatility', 'openInterest']
+        in_range = chain_df['strike'].between(fromStrike, toStrike)
+        df_calls = chain_df.loc[in_range & (chain_df['option_type'] == 'call'), gamma_columns]
+        df_puts = chain_df.loc[in_range & (chain_df['option_type'] == 'put'), gamma_columns]
         
         if df_calls.empty or df_puts.empty:
             print(f"No options in strike range for {ticker}")
             return None
         
         # Merge dataframes
-        df = pd.merge(df_calls, df_puts, on=['ExpirationDate', 'strike'], suffixes=('_call', '_put'))
+        df = pd.merge(df_calls, df_puts, on=['expiration', 'strike'], suffixes=('_call', '_put'))
         if df.empty:
             print(f"Empty merged dataframe for {ticker}")
             return None
             
         df = df.rename(columns={'strike': 'StrikePrice'})
         
-        # Calculate DTE
-        df['daysTillExp'] = [1/252 if (np.busday_count(today, exp.date())) == 0 
-                        else np.busday_count(today, exp.date())/252 for exp in df['ExpirationDate']]
-        
-        # Calculate gamma profile
-        levels = np.linspace(fromStrike, toStrike, 30)
-        totalGamma = []
-        
-        def calcGammaEx(S, K, vol, T, r, q, optType, OI):
-            if T == 0 or vol == 0:
-                return 0
-            dp = (np.log(S/K) + (r - q + 0.5*vol**2)*T) / (vol*np.sqrt(T))
-            gamma = np.exp(-q*T) * norm.pdf(dp) / (S * vol * np.sqrt(T))
-            return OI * 100 * S * S * 0.01 * gamma
-        
-        for level in levels:
-            df['callGEX'] = df.apply(lambda row: calcGammaEx(level, row['StrikePrice'], 
-                                                        row['impliedVolatility_call'], 
-                                                        row['daysTillExp'], 0, 0, 
-                                                        "call", row['openInterest_call']), axis=1)
-            df['putGEX'] = df.apply(lambda row: calcGammaEx(level, row['StrikePrice'], 
-                                                        row['impliedVolatility_put'], 
-                                                        row['daysTillExp'], 0, 0, 
-                                                        "put", row['openInterest_put']), axis=1)
-            totalGamma.append((df['callGEX'].sum() - df['putGEX'].sum()) / 10**9)
-        
-        # Find zero crossing
-        zero_crossings = []
-        for i in range(len(levels)-1):
-            if (totalGamma[i] * totalGamma[i+1] <= 0):
-                x0, x1 = levels[i], levels[i+1]
-                y0, y1 = totalGamma[i], totalGamma[i+1]
-                if y0 != y1:
-                    gamma_flip = x0 - y0 * (x1 - x0) / (y1 - y0)
-                    zero_crossings.append(gamma_flip)
+        # Calculate DTE once per expiration and broadcast to the rows
+        df['daysTillExp'] = time_to_expiry(df['expiration'], today, holidays=holidays)
+        
+        # Find every gamma flip; the first one is published
+        zero_crossings, _ = find_gamma_flips(df, fromStrike, toStrike, method=method or DEFAULT_FLIP_METHOD)
+        if len(zero_crossings) > 1:
+            print(f"{ticker}: {len(zero_crossings)} gamma flips at {', '.join(f'{x:.2f}' for x in zero_crossings)}")
         
         gamma_flip = zero_crossings[0] if zero_crossings else np.nan
         
@@ -82,8 +233,161 @@ def calculate_gamma_flip(ticker, all_options, spot, fromStrike, toStrike, today)
         strike_puts = df.groupby('StrikePrice')['openInterest_put'].sum().nlargest(2).index.tolist()
         
         # Format output
-        output = f"{ticker}:{','.join(map(lambda x: f'{int(x)}', strike_calls))},{','.join(map(lambda x: f'{int(x)}', strike_puts))},{gamma_flip:.0f}"
-        return output
+        return format_gamma_output(ticker, strike_calls, strike_puts, gamma_flip)
     except Exception as e:
         print(f"Error in gamma flip calculation for {ticker}: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def calculate_gamma_flips_batch(snapshot_df, today, method=None, holidays=None,
+                                lower=0.5, upper=2.0, points=30, coarse_points=15, chunk_rows=50000,
+                                return_profile=False):
+    """
+    Calculate gamma flips and key strikes for every ticker of a snapshot at once
+    
+    All tickers' call/put rows are merged in one pass and their GEX profiles
+    are evaluated together: every contract is priced on its own ticker's
+    level grid (lower..upper x spot) and the results are summed per ticker
+    with np.bincount. Only the adaptive root refinement runs per ticker.
+    
+    Args:
+        snapshot_df (DataFrame): Chain rows for all tickers with ticker,
+            underlying_price, expiration, strike, option_type,
+            impliedVolatility and openInterest columns
+        today (datetime): Current date
+        method (str, optional): 'grid' or 'adaptive', defaults to DEFAULT_FLIP_METHOD
+        holidays (list, optional): Market holidays excluded from time to expiry
+        lower (float): Lowest scan level as a multiple of spot
+        upper (float): Highest scan level as a multiple of spot
+        points (int): Number of levels for the grid method
+        coarse_points (int): Number of levels for the adaptive coarse scan
+        chunk_rows (int): Contracts evaluated per block, bounds peak memory
+        return_profile (bool): Also return the per-expiry GEX profile
+        
+    Returns:
+        dict: ticker -> formatted output string (same as calculate_gamma_flip),
+            in order of first appearance; tickers without a result are omitted.
+            With return_profile, a (results, profile) tuple where profile has one
+            row per ticker, expiration and scan level with call_gex, put_gex
+            and net_gex in billions (sum net_gex over expirations for the total)
+    """
+    method = method or DEFAULT_FLIP_METHOD
+    gamma_columns = ['ticker', 'expiration', 'strike', 'impliedVolatility', 'openInterest']
+    
+    try:
+        spot_by_ticker = snapshot_df.groupby('ticker', sort=False, observed=True)['underlying_price'].first()
+        tickers = spot_by_ticker.index.tolist()
+        
+        # transform keeps a float column when ticker is categorical (map would not)
+        spots = snapshot_df.groupby('ticker', sort=False, observed=True)['underlying_price'].transform('first')
+        in_range = snapshot_df['strike'].between(lower * spots, upper * spots)
+        is_call = snapshot_df['option_type'] == 'call'
+        df_calls = snapshot_df.loc[in_range & is_call, gamma_columns]
+        df_puts = snapshot_df.loc[in_range & ~is_call, gamma_columns]
+        
+        df = pd.merge(df_calls, df_puts, on=['ticker', 'expiration', 'strike'], suffixes=('_call', '_put'))
+        df = df.rename(columns={'strike': 'StrikePrice'})
+        df['daysTillExp'] = time_to_expiry(df['expiration'], today, holidays=holidays)
+    except (KeyError, ValueError) as e:
+        # Missing columns or unparseable expirations; anything else is a bug and raises
+        print(f"Error in batched gamma flip calculation: {e}")
+        return ({}, None) if return_profile else {}
+    
+    if df.empty:
+        return ({}, None) if return_profile else {}
+    
+    # Per-ticker level grids, identical to the per-ticker calculation
+    ticker_codes = pd.Categorical(df['ticker'], categories=tickers).codes
+    ticker_spots = spot_by_ticker.to_numpy(dtype=float)
+    levels = np.vstack([flip_scan_levels(lower * spot, upper * spot, method, points, coarse_points)
+                        for spot in ticker_spots])
+    
+    strikes = df['StrikePrice'].to_numpy(dtype=float)
+    T = df['daysTillExp'].to_numpy(dtype=float)
+    call_iv = df['impliedVolatility_call'].to_numpy(dtype=float)
+    call_oi = df['openInterest_call'].to_numpy(dtype=float)
+    put_iv = df['impliedVolatility_put'].to_numpy(dtype=float)
+    put_oi = df['openInterest_put'].to_numpy(dtype=float)
+    
+    # Sum call and put exposure per (ticker, expiration) group and level;
+    # ticker totals are the sum over that ticker's expirations
+    group_codes, group_keys = pd.MultiIndex.from_arrays(
+        [ticker_codes, df['expiration'].to_numpy()]
+    ).factorize()
+    n_groups, n_levels = len(group_keys), levels.shape[1]
+    group_call = np.zeros((n_levels, n_groups))
+    group_put = np.zeros((n_levels, n_groups))
+    
+    for start in range(0, len(df), chunk_rows):
+        rows = slice(start, start + chunk_rows)
+        # Each contract's levels come from its own ticker: shape (levels, contracts)
+        S = levels[ticker_codes[rows]].T
+        # Flattened (level, group) bins so one bincount covers every level
+        bins = (np.arange(n_levels)[:, None] * n_groups + group_codes[rows]).ravel()
+        # Missing values are skipped per side, as nansum does per ticker
+        for side, iv, oi in ((group_call, call_iv, call_oi), (group_put, put_iv, put_oi)):
+            gex = np.nan_to_num(calc_gamma_exposure_at(S, strikes[rows], iv[rows], T[rows], oi[rows]))
+            side += np.bincount(bins, weights=gex.ravel(), minlength=n_levels * n_groups).reshape(n_levels, n_groups)
+    
+    group_ticker = np.array([key[0] for key in group_keys])
+    totals = np.zeros((len(tickers), n_levels))
+    np.add.at(totals, group_ticker, ((group_call - group_put) / 10**9).T)
+    
+    # Key strikes for every ticker in one groupby
+    oi_by_strike = df.groupby(['ticker', 'StrikePrice'], sort=True, observed=True)[['openInterest_call', 'openInterest_put']].sum()
+    
+    results = {}
+    ticker_rows = df.groupby(ticker_codes, sort=False).indices
+    for code, ticker in enumerate(tickers):
+        if code not in ticker_rows:
+            print(f"No options in strike range for {ticker}")
+            continue
+        
+        try:
+            ticker_df = df.iloc[ticker_rows[code]]
+            gex_at = lambda level, ticker_df=ticker_df: net_gamma_exposure(level, ticker_df)[0]
+            zero_crossings = crossings_from_profile(levels[code], totals[code], method, gex_at)
+            if len(zero_crossings) > 1:
+                print(f"{ticker}: {len(zero_crossings)} gamma flips at {', '.join(f'{x:.2f}' for x in zero_crossings)}")
+            gamma_flip = zero_crossings[0] if zero_crossings else np.nan
+            
+            ticker_oi = oi_by_strike.loc[ticker]
+            strike_calls = ticker_oi['openInterest_call'].nlargest(2).index.tolist()
+            strike_puts = ticker_oi['openInterest_put'].nlargest(2).index.tolist()
+            results[ticker] = format_gamma_output(ticker, strike_calls, strike_puts, gamma_flip)
+        except Exception as e:
+            print(f"Error in gamma flip calculation for {ticker}: {e}")
+    
+    if not return_profile:
+        return results
+    
+    # Long-format profile: one row per ticker, expiration and level
+    group_spots = ticker_spots[group_ticker]
+    group_levels = levels[group_ticker]
+    profile = pd.DataFrame({
+        'ticker': np.repeat([tickers[code] for code in group_ticker], n_levels),
+        'expiration': np.repeat([key[1] for key in group_keys], n_levels),
+        'underlying_price': np.repeat(group_spots, n_levels),
+        'level': group_levels.ravel(),
+        'level_moneyness': (group_levels / group_spots[:, None]).ravel(),
+        'call_gex': group_call.T.ravel() / 10**9,
+        'put_gex': group_put.T.ravel() / 10**9,
+    })
+    profile['net_gex'] = profile['call_gex'] - profile['put_gex']
+    profile = profile.sort_values(['ticker', 'expiration', 'level'], kind='stable', ignore_index=True)
+    
+    return results, profile
+
+def load_gamma_profile(filepath, tickers=None, columns=None):
+    """
+    Load a saved gamma_profile.parquet, reading only what is needed
+    
+    Args:
+        filepath (str): Path to gamma_profile.parquet
+        tickers (list, optional): Only load these tickers
+        columns (list, optional): Only load these columns
+        
+    Returns:
+        DataFrame: Gamma exposure profile rows
+    """
+    filters = [('ticker', 'in', list(tickers))] if tickers is not None else None
+    return pd.read_parquet(filepath, columns=columns, filters=filters)
@@ -0,0 +1,280 @@
+# greeks.py - Vectorized Black-Scholes Greeks computed once per snapshot
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from utils import time_to_expiry
+
+GREEK_COLUMNS = ['delta', 'gamma', 'vega', 'theta', 'vanna', 'charm']
+
+def d1_d2(S, K, T, vol, r=0, q=0):
+    """
+    Black-Scholes d1 and d2, vectorized
+
+    Args:
+        S (ndarray): Spot price(s)
+        K (ndarray): Strike price(s)
+        T (ndarray): Time to expiry in years
+        vol (ndarray): Implied volatility
+        r (float): Risk-free rate
+        q (float): Dividend yield
+
+    Returns:
+        tuple: (d1, d2) arrays
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vol_sqrt_t = vol * np.sqrt(T)
+        d1 = (np.log(S/K) + (r - q + 0.5*vol**2)*T) / vol_sqrt_t
+    return d1, d1 - vol_sqrt_t
+
+def bs_gamma(S, K, T, vol, r=0, q=0):
+    """
+    Black-Scholes gamma, vectorized (shared by the greeks stage and GEX profiles)
+
+    Args:
+        S (ndarray): Spot price(s), broadcastable against the contracts
+        K (ndarray): Strike price(s)
+        T (ndarray): Time to expiry in years
+        vol (ndarray): Implied volatility
+        r (float): Risk-free rate
+        q (float): Dividend yield
+
+    Returns:
+        ndarray: Gamma per unit of underlying
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dp = (np.log(S/K) + (r - q + 0.5*vol**2)*T) / (vol*np.sqrt(T))
+        return np.exp(-q*T) * norm.pdf(dp) / (S * vol * np.sqrt(T))
+
+def black_scholes_greeks(S, K, T, vol, is_call, r=0, q=0, periods_per_year=252):
+    """
+    Black-Scholes Greeks for arrays of contracts in one pass
+
+    T is in the same business-day years as utils.time_to_expiry, so theta
+    and charm are per business day (one 1/periods_per_year step of T). Vega
+    is per 1 vol point. Contracts with no time or volatility left get NaN.
+
+    Args:
+        S (ndarray): Spot price(s)
+        K (ndarray): Strike prices
+        T (ndarray): Time to expiry in years
+        vol (ndarray): Implied volatilities
+        is_call (ndarray): True for calls, False for puts
+        r (float): Risk-free rate
+        q (float): Dividend yield
+        periods_per_year (int): Business days per year used to measure T
+
+    Returns:
+        dict: Greek name -> ndarray
+    """
+    S, K, T, vol = (np.asarray(x, dtype=float) for x in (S, K, T, vol))
+    valid = (T > 0) & (vol > 0)
+    T = np.where(valid, T, np.nan)
+    vol = np.where(valid, vol, np.nan)
+
+    d1, d2 = d1_d2(S, K, T, vol, r, q)
+    pdf_d1 = norm.pdf(d1)
+    disc_q = np.exp(-q*T)
+    disc_r = np.exp(-r*T)
+    sqrt_t = np.sqrt(T)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gamma = disc_q * pdf_d1 / (S * vol * sqrt_t)
+        vega = S * disc_q * pdf_d1 * sqrt_t
+        vanna = -disc_q * pdf_d1 * d2 / vol
+        decay = -S * disc_q * pdf_d1 * vol / (2 * sqrt_t)
+        charm_common = disc_q * pdf_d1 * (2*(r - q)*T - d2*vol*sqrt_t) / (2*T*vol*sqrt_t)
+
+    delta = np.where(is_call, disc_q * norm.cdf(d1), -disc_q * norm.cdf(-d1))
+    theta = np.where(is_call,
+                     decay - r*K*disc_r*norm.cdf(d2) + q*S*disc_q*norm.cdf(d1),
+                     decay + r*K*disc_r*norm.cdf(-d2) - q*S*disc_q*norm.cdf(-d1))
+    charm = np.where(is_call,
+                     q*disc_q*norm.cdf(d1) - charm_common,
+                     -q*disc_q*norm.cdf(-d1) - charm_common)
+
+    return {
+        'delta': delta,
+        'gamma': gamma,
+        'vega': vega / 100,
+        'theta': theta / periods_per_year,
+        'vanna': vanna,
+        'charm': charm / periods_per_year,
+    }
+
+def bs_price(S, K, T, vol, is_call, r=0, q=0):
+    """
+    Black-Scholes option price, vectorized
+
+    Args:
+        S (ndarray): Spot price(s)
+        K (ndarray): Strike prices
+        T (ndarray): Time to expiry in years
+        vol (ndarray): Volatilities
+        is_call (ndarray): True for calls, False for puts
+        r (float): Risk-free rate
+        q (float): Dividend yield
+
+    Returns:
+        ndarray: Option prices
+    """
+    d1, d2 = d1_d2(S, K, T, vol, r, q)
+    disc_q = S * np.exp(-q*T)
+    disc_r = K * np.exp(-r*T)
+    return np.where(is_call,
+                    disc_q*norm.cdf(d1) - disc_r*norm.cdf(d2),
+                    disc_r*norm.cdf(-d2) - disc_q*norm.cdf(-d1))
+
+def implied_volatility(price, S, K, T, is_call, r=0, q=0, tol=1e-6, max_iter=50,
+                       vol_low=1e-4, vol_high=5.0):
+    """
+    Solve Black-Scholes implied volatility for arrays of contracts at once
+
+    Every contract keeps a [low, high] bracket. Each iteration takes a
+    Newton step from the current guess and falls back to bisection when the
+    step leaves the bracket or vega is too small, so the solve always
+    converges. Only unconverged contracts are carried into the next
+    iteration.
+
+    Args:
+        price (ndarray): Option prices
+        S (ndarray): Spot price(s)
+        K (ndarray): Strike prices
+        T (ndarray): Time to expiry in years
+        is_call (ndarray): True for calls, False for puts
+        r (float): Risk-free rate
+        q (float): Dividend yield
+        tol (float): Price tolerance
+        max_iter (int): Maximum number of iterations
+        vol_low (float): Lowest volatility searched
+        vol_high (float): Highest volatility searched
+
+    Returns:
+        ndarray: Implied volatilities, NaN where the price is outside the
+            arbitrage bounds or inputs are missing
+    """
+    price, S, K, T = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (price, S, K, T)))
+    is_call = np.broadcast_to(np.asarray(is_call, dtype=bool), price.shape)
+    iv = np.full(price.shape, np.nan)
+
+    # Prices must lie strictly between intrinsic value and the price at vol_high
+    with np.errstate(invalid='ignore'):
+        lower = bs_price(S, K, T, vol_low, is_call, r, q)
+        upper = bs_price(S, K, T, vol_high, is_call, r, q)
+        solvable = (T > 0) & (S > 0) & (K > 0) & (price > lower) & (price < upper)
+    idx = np.flatnonzero(solvable)
+    if idx.size == 0:
+        return iv
+
+    p, s, k, t, c = price.ravel()[idx], S.ravel()[idx], K.ravel()[idx], T.ravel()[idx], is_call.ravel()[idx]
+    low = np.full(idx.size, vol_low)
+    high = np.full(idx.size, vol_high)
+    # Brenner-Subrahmanyam starting point, clipped into the bracket
+    vol = np.clip(np.sqrt(2*np.pi/t) * p / s, vol_low * 2, vol_high / 2)
+
+    for _ in range(max_iter):
+        diff = bs_price(s, k, t, vol, c, r, q) - p
+        done = np.abs(diff) < tol
+        if done.all():
+            break
+
+        # Tighten the bracket: price increases with volatility
+        high = np.where(diff > 0, vol, high)
+        low = np.where(diff < 0, vol, low)
+
+        d1, _ = d1_d2(s, k, t, vol, r, q)
+        vega = s * np.exp(-q*t) * norm.pdf(d1) * np.sqrt(t)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            newton = vol - diff / vega
+        use_newton = (vega > 1e-8) & (newton > low) & (newton < high)
+        vol = np.where(done, vol, np.where(use_newton, newton, 0.5*(low + high)))
+
+        # Carry only unconverged contracts into the next iteration
+        iv.ravel()[idx[done]] = vol[done]
+        keep = ~done
+        idx, p, s, k, t, c, low, high, vol = (x[keep] for x in (idx, p, s, k, t, c, low, high, vol))
+    else:
+        diff = bs_price(s, k, t, vol, c, r, q) - p
+        done = np.abs(diff) < tol * 100
+        iv.ravel()[idx[done]] = vol[done]
+        return iv
+
+    iv.ravel()[idx] = vol
+    return iv
+
+def add_mid_iv(df, today, r=0, q=0, holidays=None):
+    """
+    Add implied volatility solved from the bid/ask mid next to Yahoo's value
+
+    Contracts without a valid two-sided quote (bid and ask > 0, ask >= bid)
+    get NaN.
+
+    Args:
+        df (DataFrame): Vol surface frame with bid, ask, strike, expiration,
+            option_type and underlying_price columns
+        today (datetime): Valuation date
+        r (float): Risk-free rate
+        q (float): Dividend yield
+        holidays (list, optional): Market holidays excluded from time to expiry
+
+    Returns:
+        DataFrame: The same frame with mid_price and mid_iv columns added
+    """
+    bid = df['bid'].to_numpy(dtype=float)
+    ask = df['ask'].to_numpy(dtype=float)
+    with np.errstate(invalid='ignore'):
+        quoted = (bid > 0) & (ask > 0) & (ask >= bid)
+    df['mid_price'] = np.where(quoted, 0.5*(bid + ask), np.nan)
+
+    if df.empty:
+        df['mid_iv'] = pd.Series(dtype=float)
+        return df
+
+    df['mid_iv'] = implied_volatility(
+        df['mid_price'].to_numpy(dtype=float),
+        df['underlying_price'].to_numpy(dtype=float),
+        df['strike'].to_numpy(dtype=float),
+        time_to_expiry(df['expiration'], today, holidays=holidays),
+        (df['option_type'] == 'call').to_numpy(),
+        r, q
+    )
+    return df
+
+def add_greeks(df, today, r=0, q=0, iv_column='impliedVolatility', holidays=None):
+    """
+    Add Greek columns to a combined vol surface frame
+
+    Time to expiry is computed once per expiration (utils.time_to_expiry),
+    the same business-day convention as the gamma flip calculation, so the
+    stored theta and charm are per business day.
+
+    Args:
+        df (DataFrame): Vol surface frame with strike, expiration, option_type,
+            underlying_price and an implied volatility column
+        today (datetime): Valuation date
+        r (float): Risk-free rate
+        q (float): Dividend yield
+        iv_column (str): Column holding the volatility to price with
+        holidays (list, optional): Market holidays excluded from time to expiry
+
+    Returns:
+        DataFrame: The same frame with time_to_expiry and GREEK_COLUMNS added
+    """
+    if df.empty:
+        for col in ['time_to_expiry'] + GREEK_COLUMNS:
+            df[col] = pd.Series(dtype=float)
+        return df
+
+    df['time_to_expiry'] = time_to_expiry(df['expiration'], today, holidays=holidays)
+    greeks = black_scholes_greeks(
+        df['underlying_price'].to_numpy(dtype=float),
+        df['strike'].to_numpy(dtype=float),
+        df['time_to_expiry'].to_numpy(dtype=float),
+        df[iv_column].to_numpy(dtype=float),
+        (df['option_type'] == 'call').to_numpy(),
+        r, q
+    )
+    for name in GREEK_COLUMNS:
+        df[name] = greeks[name]
+    return df
@@ -20,17 +20,32 @@
 
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import pandas as pd
 
 # Import modules
-from data_collection import process_ticker, prepare_for_parquet, save_raw_options_data
-from gamma_analysis import calculate_gamma_flip
-from volatility_analysis import analyze_skew
-from sentiment_analysis import analyze_overnight_changes, analyze_daily_changes, analyze_statistical_indicators
+from data_collection import process_ticker, prepare_for_parquet, constant_category, RawOptionsWriter, fetch_bulk_price_snapshots
+from rate_limiter import configure_rate_limiter
+from gamma_analysis import calculate_gamma_flips_batch
+from greeks import add_greeks, add_mid_iv
+from snapshot_dataset import write_snapshot_dataset
+from price_history import (append_price_history, compact_price_history, load_previous_run_prices,
+                           PRICE_HISTORY_COMPACT_AFTER)
+from volatility_analysis import analyze_skew, fit_svi_surface, analyze_term_structure, term_structure_changes
+from sentiment_analysis import compare_snapshots, analyze_statistical_indicators
 from dashboard import create_overnight_dashboard, create_daily_dashboard
 from discord_webhooks import send_tradingview_data, send_overnight_sentiment, send_daily_sentiment
 
+# Number of tickers processed concurrently by run_automated_data_collection
+DEFAULT_MAX_WORKERS = int(os.environ.get('OPTIONS_MAX_WORKERS', 4))
+
+# Number of option expiries fetched concurrently within each ticker
+DEFAULT_EXPIRY_WORKERS = int(os.environ.get('OPTIONS_EXPIRY_WORKERS', 4))
+
+# Chain columns used by the batched gamma flip engine
+GAMMA_INPUT_COLUMNS = ['expiration', 'strike', 'option_type', 'impliedVolatility', 'openInterest']
+
 # Dynamically import utils or test_utils depending on test_mode
 def import_utils(test_mode=False):
     if test_mode:
@@ -132,12 +147,19 @@ def get_nested_folder_path(trading_date=None, run_type=None, base_dir='options_d
         'date_str': trading_date.strftime('%Y-%m-%d')  # Keep this for compatibility
     }
 
-def run_automated_data_collection(test_mode=False):
+def run_automated_data_collection(test_mode=False, max_workers=None, requests_per_second=None, burst=None, expiry_workers=None):
     """
     Automated pipeline for scheduled execution
     
     Args:
         test_mode (bool): If True, save data to test folders instead of production
+        max_workers (int, optional): Number of tickers processed concurrently,
+            defaults to DEFAULT_MAX_WORKERS
+        requests_per_second (float, optional): Target yfinance request rate shared
+            by all workers, defaults to YF_REQUESTS_PER_SECOND
+        burst (int, optional): Maximum back-to-back yfinance requests, defaults to YF_BURST
+        expiry_workers (int, optional): Number of expiries fetched concurrently per
+            ticker, defaults to DEFAULT_EXPIRY_WORKERS (1 = sequential)
     """
     # Dynamically import the appropriate utils module
     utils = import_utils(test_mode)
@@ -166,150 +188,178 @@ def run_automated_data_collection(test_mode=False):
     print(f"Saving data to: {folder_path}")
     
     # Fixed settings for automated runs
-    batch_size = 10  # Process tickers in batches to avoid API issues
-    delay = 2  # Delay between API calls in seconds
+    if max_workers is None:
+        max_workers = DEFAULT_MAX_WORKERS
+    if expiry_workers is None:
+        expiry_workers = DEFAULT_EXPIRY_WORKERS
     
-    # Always run both gamma and volatility analysis
-    run_gamma = True
+    # API pacing is handled by the shared rate limiter inside data_collection
+    if requests_per_second is not None or burst is not None:
+        configure_rate_limiter(requests_per_second, burst)
+    
+    # Gamma flips run once for all tickers after collection (see below)
     run_vol = True
     
     # Result collections
-    gamma_results = []
+    gamma_inputs = []
     all_vol_surface_data = []
     failed_tickers = []
-    all_raw_data = {}
     price_data_list = []
     
     # Use the tickers from the dynamically imported utils module
     tickers_to_process = utils.DEFAULT_TICKERS
+    total_tickers = len(tickers_to_process)
+    
+    # Fetch spot/prev_close for the whole universe up front in a few batched requests
+    print(f"Downloading prices for {total_tickers} tickers...")
+    price_snapshots = fetch_bulk_price_snapshots(tickers_to_process)
+    print(f"Got prices for {len(price_snapshots)}/{total_tickers} tickers")
     
-    # Process tickers in batches
-    for i in range(0, len(tickers_to_process), batch_size):
-        batch = tickers_to_process[i:i+batch_size]
-        print(f"Processing batch {i//batch_size + 1}/{(len(tickers_to_process) + batch_size - 1)//batch_size}")
+    def collect_ticker(index, ticker):
+        """Run process_ticker for one ticker inside a worker thread"""
+        start_time = time.time()
         
-        for j, ticker in enumerate(batch, 1):
-            start_time = time.time()
-            
-            # Add delay between API calls (except for the first one in each batch)
-            if j > 1:
-                time.sleep(delay)
-            
-            # Process ticker - now passes the utils module
-            gamma_result, vol_surface_df, raw_data, ticker_price_data = process_ticker(
-                ticker, 
-                (i + j), 
-                len(tickers_to_process), 
-                run_gamma=run_gamma,
-                run_vol=run_vol,
-                utils_module=utils  # Pass the dynamically imported utils module
-            )
-            
-            # Store raw data if available
-            if raw_data:
-                all_raw_data.update(raw_data)
+        # Process ticker - now passes the utils module
+        result = process_ticker(
+            ticker, 
+            index, 
+            total_tickers, 
+            run_gamma=False,  # Gamma flips are calculated for all tickers at once below
+            run_vol=run_vol,
+            utils_module=utils,  # Pass the dynamically imported utils module
+            expiry_workers=expiry_workers,
+            price_snapshot=price_snapshots.get(ticker)
+        )
+        return result, time.time() - start_time
+    
+    print(f"Processing {total_tickers} tickers with {max_workers} workers")
+    
+    # Raw options are streamed to disk one ticker at a time instead of being
+    # held in memory until the end of the run. The file is moved into place
+    # when the block exits normally; on an exception the partial file is removed.
+    with RawOptionsWriter(
+        os.path.join(folder_path, 'raw_options.parquet'),
+        trading_date.strftime('%Y-%m-%d_%H%M'),
+        run_type,
+        trading_date
+    ) as raw_writer:
+        # Run tickers through a bounded worker pool; results are merged below in
+        # submission order so output files do not depend on completion order
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(collect_ticker, index, ticker)
+                for index, ticker in enumerate(tickers_to_process, 1)
+            ]
+        
+            for position, ticker in enumerate(tickers_to_process):
+                # Drop the future once consumed so its raw frames can be freed
+                future, futures[position] = futures[position], None
+                try:
+                    (_, vol_surface_df, raw_data, ticker_price_data), elapsed = future.result()
+                except Exception as e:
+                    print(f"Error processing {ticker}: {e}")
+                    vol_surface_df, raw_data, ticker_price_data = None, None, None
+                    elapsed = 0
             
-            # Store price data if available
-            if ticker_price_data:
-                price_data_list.append(ticker_price_data)
+                # Write raw data if available
+                if raw_data:
+                    try:
+                        for raw_ticker, ticker_raw in raw_data.items():
+                            raw_writer.write_ticker(
+                                raw_ticker, ticker_raw['chain'], ticker_raw['spot'], ticker_raw['prev_close']
+                            )
+                    except Exception as e:
+                        print(f"Error writing raw options data for {ticker}: {e}")
+                
+                    # Keep only the columns the batched gamma engine needs
+                    for raw_ticker, ticker_raw in raw_data.items():
+                        gamma_inputs.append(
+                            ticker_raw['chain'][GAMMA_INPUT_COLUMNS].assign(
+                                ticker=raw_ticker, underlying_price=ticker_raw['spot']
+                            )
+                        )
             
-            # Track results
-            success = False
+                # Store price data if available
+                if ticker_price_data:
+                    price_data_list.append(ticker_price_data)
             
-            # Handle gamma flip results
-            if run_gamma:
-                if gamma_result:
-                    gamma_results.append(gamma_result)
-                    success = True
+                # Track results
+                success = False
             
-            # Handle volatility surface results
-            if run_vol:
-                if vol_surface_df is not None:
-                    vol_surface_df['date'] = trading_date.strftime('%Y-%m-%d')
-                    vol_surface_df['trading_date'] = trading_date.strftime('%Y-%m-%d')
-                    vol_surface_df['run_type'] = run_type
+                # Handle volatility surface results
+                if run_vol:
+                    if vol_surface_df is not None:
+                        num_rows = len(vol_surface_df)
+                        vol_surface_df['date'] = constant_category(trading_date.strftime('%Y-%m-%d'), num_rows)
+                        vol_surface_df['trading_date'] = constant_category(trading_date.strftime('%Y-%m-%d'), num_rows)
+                        vol_surface_df['run_type'] = constant_category(run_type, num_rows)
                     
-                    all_vol_surface_data.append(vol_surface_df)
-                    success = True
-                else:
-                    # Only add to failed tickers if it's not a statistical ticker
-                    if ticker not in utils.STATISTICAL_TICKERS:
-                        failed_tickers.append(ticker)
+                        all_vol_surface_data.append(vol_surface_df)
+                        success = True
+                    else:
+                        # Only add to failed tickers if it's not a statistical ticker
+                        if ticker not in utils.STATISTICAL_TICKERS:
+                            failed_tickers.append(ticker)
             
-            # Reporting
-            elapsed = time.time() - start_time
-            if success or ticker in utils.STATISTICAL_TICKERS:
-                print(f"✓ {ticker} completed in {elapsed:.2f} seconds")
-            else:
-                print(f"✗ {ticker} failed")
+                # Reporting
+                if success or ticker in utils.STATISTICAL_TICKERS:
+                    print(f"✓ {ticker} completed in {elapsed:.2f} seconds")
+                else:
+                    print(f"✗ {ticker} failed")
     
-    # Save statistical_indicator price data in a single parquet
+    # Finish raw data file
+    raw_data_file = raw_writer.close()
+    if raw_data_file:
+        print(f"Raw options data saved to {raw_data_file}")
+        
+        # Same rows in the partitioned dataset (date/run_type/ticker bucket) for pruned queries
+        try:
+            partition_path = write_snapshot_dataset(raw_data_file, 'raw_options', trading_date, run_type, test_mode=test_mode)
+            print(f"Raw options dataset partition written to {partition_path}")
+        except Exception as e:
+            print(f"Error writing raw options dataset partition: {e}")
+    
+    # Save statistical_indicator price data to the yearly price history
     if price_data_list:
         price_df = pd.DataFrame(price_data_list)
+        price_df['run_type'] = run_type
         
-        # Create a dedicated folder for price data
-        base_dir = 'options_data_test' if test_mode else 'options_data'
-        price_data_dir = os.path.join(base_dir, folder_info['year'])
-        os.makedirs(price_data_dir, exist_ok=True)
-        
-        # Path to the consolidated price data file
-        consolidated_price_file = os.path.join(price_data_dir, 'price_data_history.parquet')
-        
-        # If historical file exists, read it and append new data
-        if os.path.exists(consolidated_price_file):
-            try:
-                historical_price_df = pd.read_parquet(consolidated_price_file)
-                
-                # Check if we already have data for this trading date
-                existing_data = historical_price_df[
-                    (historical_price_df['trading_date'] == trading_date.strftime('%Y-%m-%d')) & 
-                    (historical_price_df['run_type'] == run_type)
-                ]
-                
-                if not existing_data.empty:
-                    print(f"Found existing price data for {trading_date.strftime('%Y-%m-%d')} {run_type} - replacing")
-                    # Remove existing data for this date/run_type
-                    historical_price_df = historical_price_df.loc[
-                        ~((historical_price_df['trading_date'] == trading_date.strftime('%Y-%m-%d')) & 
-                        (historical_price_df['run_type'] == run_type))
-                    ]
-                
-                # Add run_type to new data
-                price_df['run_type'] = run_type
-                
-                # Append new data
-                combined_price_df = pd.concat([historical_price_df, price_df])
-                combined_price_df.to_parquet(consolidated_price_file)
-                print(f"Updated historical price data saved to {consolidated_price_file}")
-                
-            except Exception as e:
-                print(f"Error updating historical price data: {e}")
-                # If error, just save today's data
-                price_df['run_type'] = run_type
-                price_df.to_parquet(consolidated_price_file)
-                print(f"New historical price data saved to {consolidated_price_file}")
-        else:
-            # No historical file exists yet, create it
-            price_df['run_type'] = run_type
-            price_df.to_parquet(consolidated_price_file)
-            print(f"New historical price data saved to {consolidated_price_file}")
+        # Only this run's rows are written; re-runs replace the run's own file
+        try:
+            history_file = append_price_history(price_df, trading_date, run_type, test_mode=test_mode)
+            print(f"Price history for {trading_date.strftime('%Y-%m-%d')} {run_type} saved to {history_file}")
+            
+            compacted_file = compact_price_history(trading_date.year, min_files=PRICE_HISTORY_COMPACT_AFTER,
+                                                   test_mode=test_mode)
+            if compacted_file:
+                print(f"Compacted price history into {compacted_file}")
+        except Exception as e:
+            print(f"Error updating price history: {e}")
         
         # Also save daily file in the nested structure for consistency
         daily_price_file = os.path.join(folder_path, 'price_data.parquet')
         price_df.to_parquet(daily_price_file)
         print(f"Daily price data saved to {daily_price_file}")
     
-    # Save raw data
-    if all_raw_data:
-        raw_data_file = save_raw_options_data(
-            all_raw_data, 
-            trading_date.strftime('%Y-%m-%d_%H%M'), 
-            run_type, 
-            trading_date,
-            test_mode=test_mode
+    # Gamma flips for every ticker in one batched pass
+    gamma_results = []
+    if gamma_inputs:
+        print("Calculating gamma flips...")
+        gamma_snapshot = pd.concat(gamma_inputs, ignore_index=True)
+        gamma_inputs = None
+        gamma_by_ticker, gamma_profile = calculate_gamma_flips_batch(
+            gamma_snapshot, pd.Timestamp.today().date(), return_profile=True
         )
-        print(f"Raw options data saved to {raw_data_file}")
+        gamma_results = list(gamma_by_ticker.values())
         
+        # Keep the full per-expiry GEX profile for charting and flip studies
+        if gamma_profile is not None and not gamma_profile.empty:
+            gamma_profile['trading_date'] = trading_date.strftime('%Y-%m-%d')
+            gamma_profile['run_type'] = run_type
+            gamma_profile_file = os.path.join(folder_path, 'gamma_profile.parquet')
+            gamma_profile.to_parquet(gamma_profile_file, index=False)
+            print(f"Gamma exposure profile saved to {gamma_profile_file}")
+    
     # Output for gamma flip
     if gamma_results:
         # Join all results with semicolons
@@ -362,6 +412,13 @@ def run_automated_data_collection(test_mode=False):
     # Output for volatility surface
     if all_vol_surface_data:
         combined_df = pd.concat(all_vol_surface_data)
+        
+        # IV re-solved from the bid/ask mid (kept next to Yahoo's impliedVolatility)
+        # and Greeks are computed once here and stored with the surface for every analytic
+        combined_df = add_mid_iv(combined_df, trading_date.date())
+        combined_df = add_greeks(combined_df, trading_date.date())
+        
+        # Compact dtypes (categoricals, dates, float32) once the float64 stages are done
         combined_df = prepare_for_parquet(combined_df)
         
         # Save combined data
@@ -369,7 +426,29 @@ def run_automated_data_collection(test_mode=False):
         combined_df.to_parquet(vol_surface_file)
         print(f"Volatility Surface data saved to {vol_surface_file}")
         
-        # For morning runs, try to find and compare with previous evening data (Overnight Analysis)
+        try:
+            partition_path = write_snapshot_dataset(combined_df, 'vol_surface', trading_date, run_type, test_mode=test_mode)
+            print(f"Volatility Surface dataset partition written to {partition_path}")
+        except Exception as e:
+            print(f"Error writing volatility surface dataset partition: {e}")
+        
+        # Fitted SVI smile per ticker/expiry: a compact parameter table that
+        # answers IV queries at any strike/tenor without the raw rows
+        try:
+            svi_params = fit_svi_surface(combined_df, trading_date.date())
+            svi_params['trading_date'] = trading_date.strftime('%Y-%m-%d')
+            svi_params['run_type'] = run_type
+            svi_file = os.path.join(folder_path, 'svi_params.parquet')
+            svi_params.to_parquet(svi_file, index=False)
+            print(f"SVI parameters for {len(svi_params)} expiries saved to {svi_file}")
+        except Exception as e:
+            print(f"Error fitting SVI surface: {e}")
+        
+        # Reference snapshots compared against this run in one pass:
+        # name -> (trading date, run type, (reference suffix, current suffix))
+        comparison_windows = {}
+        
+        # For morning runs, compare with the previous trading day's evening (Overnight Analysis)
         if run_type == "morning":
             # Get the current weekday (0=Monday, 1=Tuesday, ..., 6=Sunday)
             current_weekday = trading_date.weekday()
@@ -387,102 +466,86 @@ def run_automated_data_collection(test_mode=False):
             
             print(f"Current weekday: {current_weekday} ({trading_date.strftime('%A')})")
             print(f"Using previous trading day: {prev_date.strftime('%Y-%m-%d')} ({prev_date.strftime('%A')}) for comparison")
-            
-            # Get path to previous evening data
-            prev_evening_info = get_nested_folder_path(prev_date, "evening", test_mode=test_mode)
-            prev_evening_path = prev_evening_info['path']
-            prev_evening_file = os.path.join(prev_evening_path, 'vol_surface.parquet')
-
-            if os.path.exists(prev_evening_file):
-                print(f"Found previous evening data: {prev_evening_file}")
-                
+            comparison_windows['overnight'] = (prev_date, "evening", ('_evening', '_morning'))
+        
+        # For evening runs, compare with the previous day's evening (Daily Analysis)
+        # and with this morning's snapshot (Intraday Analysis)
+        if run_type == "evening":
+            comparison_windows['daily'] = (trading_date - timedelta(days=1), "evening", ('_previous', '_current'))
+            comparison_windows['intraday'] = (trading_date, "morning", ('_morning', '_evening'))
+        
+        # Same run one week earlier (Weekly Analysis)
+        comparison_windows['weekly'] = (trading_date - timedelta(days=7), run_type, ('_week_ago', '_current'))
+        
+        references = {}
+        for name, (ref_date, ref_run_type, suffixes) in comparison_windows.items():
+            ref_path = get_nested_folder_path(ref_date, ref_run_type, test_mode=test_mode)['path']
+            ref_file = os.path.join(ref_path, 'vol_surface.parquet')
+            if os.path.exists(ref_file):
+                print(f"Found {name} reference data: {ref_file}")
                 try:
-                    evening_df = pd.read_parquet(prev_evening_file)
-                    
-                    print("Analyzing overnight changes...")
-                    merged_data, summary, volume_factor = analyze_overnight_changes(evening_df, combined_df)
-                    
-                    # Add trading date information to output
-                    merged_data['trading_date'] = trading_date.strftime('%Y-%m-%d')
-                    merged_data['prev_trading_date'] = prev_date.strftime('%Y-%m-%d')
-                    summary['trading_date'] = trading_date.strftime('%Y-%m-%d')
-                    summary['prev_trading_date'] = prev_date.strftime('%Y-%m-%d')
-                    
+                    references[name] = (pd.read_parquet(ref_file), suffixes)
+                except Exception as e:
+                    print(f"Error loading {name} reference data: {e}")
+            else:
+                print(f"No {name} reference data found at: {ref_file}")
+        
+        # Failures are reported per window by compare_snapshots
+        comparisons = {}
+        if references:
+            print(f"Analyzing {', '.join(references)} changes...")
+            comparisons = compare_snapshots(combined_df, references)
+        
+        for name, (merged_data, summary, _) in comparisons.items():
+            try:
+                # Add trading date information to output
+                prev_date = comparison_windows[name][0]
+                for frame in (merged_data, summary):
+                    frame['trading_date'] = trading_date.strftime('%Y-%m-%d')
+                    frame['prev_trading_date'] = prev_date.strftime('%Y-%m-%d')
+                
+                summary_file = os.path.join(folder_path, f'{name}_sentiment_summary.csv')
+                summary.to_csv(summary_file)
+                
+                # Contract-level detail is only kept for the overnight and daily comparisons
+                if name in ('overnight', 'daily'):
+                    merged_data_file = os.path.join(folder_path, f'{name}_analysis.parquet')
+                    merged_data.to_parquet(merged_data_file)
+                print(f"{name.capitalize()} sentiment summary saved to {summary_file}")
+                
+                if name == 'overnight':
                     # Create and save dashboard
                     dashboard_file = os.path.join(folder_path, 'overnight_sentiment_dashboard.txt')
                     create_overnight_dashboard(summary, dashboard_file)
                     
-                    # Save detailed analysis
-                    merged_data_file = os.path.join(folder_path, 'overnight_analysis.parquet')
-                    merged_data.to_parquet(merged_data_file)
-                    
-                    summary_file = os.path.join(folder_path, 'overnight_sentiment_summary.csv')
-                    summary.to_csv(summary_file)
-                    
                     # Send overnight sentiment to Discord
                     print("Sending overnight sentiment to Discord...")
                     if send_overnight_sentiment(summary):
                         print("✓ Overnight sentiment sent to Discord successfully")
                     else:
                         print("✗ Failed to send overnight sentiment to Discord")
-                    
-                except Exception as e:
-                    print(f"Error comparing with evening data: {e}")
-            else:
-                print(f"No evening data found for comparison at: {prev_evening_file}")
+            except Exception as e:
+                print(f"Error saving {name} comparison: {e}")
         
-        # For evening runs, try to find and compare with previous day's evening data (Daily Analysis)
         if run_type == "evening":
-            # Look for previous day's evening data file
-            prev_date = trading_date - timedelta(days=1)
-            
-            # Get path to previous day's evening data
-            prev_evening_info = get_nested_folder_path(prev_date, "evening", test_mode=test_mode)
-            prev_evening_path = prev_evening_info['path']
-            prev_evening_file = os.path.join(prev_evening_path, 'vol_surface.parquet')
-            prev_price_file = os.path.join(prev_evening_path, 'price_data.parquet')
+            # Store for later dashboard creation
+            options_summary = comparisons['daily'][1] if 'daily' in comparisons else None
             
-            # Process options data for regular tickers
-            if os.path.exists(prev_evening_file):
-                print(f"Found previous day's evening data: {prev_evening_file}")
-                
-                try:
-                    prev_evening_df = pd.read_parquet(prev_evening_file)
-                    
-                    print("Analyzing day-to-day changes...")
-                    daily_merged_data, daily_summary, daily_volume_factor = analyze_daily_changes(prev_evening_df, combined_df)
-                    
-                    # Add trading date information to output
-                    daily_merged_data['trading_date'] = trading_date.strftime('%Y-%m-%d')
-                    daily_merged_data['prev_trading_date'] = prev_date.strftime('%Y-%m-%d')
-                    daily_summary['trading_date'] = trading_date.strftime('%Y-%m-%d')
-                    daily_summary['prev_trading_date'] = prev_date.strftime('%Y-%m-%d')
-                    
-                    # Store for later dashboard creation
-                    options_summary = daily_summary
-                    
-                    # Save detailed analysis
-                    daily_merged_file = os.path.join(folder_path, 'daily_analysis.parquet')
-                    daily_merged_data.to_parquet(daily_merged_file)
-                    
-                    daily_summary_file = os.path.join(folder_path, 'daily_sentiment_summary.csv')
-                    daily_summary.to_csv(daily_summary_file)
-                    
-                except Exception as e:
-                    print(f"Error comparing with previous day's evening data: {e}")
-                    options_summary = None
-            else:
-                print(f"No previous day's evening data found at: {prev_evening_file}")
-                options_summary = None
+            # Previous evening's prices from the price history, so Mondays and
+            # days after a holiday compare against the last trading session
+            prev_price_df = None
+            try:
+                prev_price_df = load_previous_run_prices(trading_date, "evening", test_mode=test_mode)
+            except Exception as e:
+                print(f"Error loading previous evening's price history: {e}")
             
             # Process price data for statistical indicators
             statistical_summary = None
             daily_price_file = os.path.join(folder_path, 'price_data.parquet')  # Current price file
-            if os.path.exists(daily_price_file) and os.path.exists(prev_price_file):
-                print(f"Found previous day's price data: {prev_price_file}")
+            if os.path.exists(daily_price_file) and prev_price_df is not None:
+                print(f"Found previous evening's price data from {prev_price_df['trading_date'].iloc[0]}")
                 
                 try:
-                    prev_price_df = pd.read_parquet(prev_price_file)
                     curr_price_df = pd.read_parquet(daily_price_file)
                     
                     print("Analyzing statistical indicators...")
@@ -519,6 +582,29 @@ def run_automated_data_collection(test_mode=False):
         skew_file = os.path.join(folder_path, 'skew_analysis.csv')
         skew_df.to_csv(skew_file)
         print(f"Skew Analysis saved to {skew_file}")
+        
+        # Constant-maturity ATM IV / 25-delta risk reversal and butterfly per ticker
+        try:
+            term_structure = analyze_term_structure(combined_df)
+            term_structure['trading_date'] = trading_date.strftime('%Y-%m-%d')
+            term_structure['run_type'] = run_type
+            term_structure_file = os.path.join(folder_path, 'term_structure.parquet')
+            term_structure.to_parquet(term_structure_file, index=False)
+            print(f"Volatility term structure saved to {term_structure_file}")
+            
+            # Day-over-day changes against the previous evening's table
+            if run_type == "evening":
+                prev_date = trading_date - timedelta(days=1)
+                prev_term_file = os.path.join(get_nested_folder_path(prev_date, "evening", test_mode=test_mode)['path'],
+                                              'term_structure.parquet')
+                if os.path.exists(prev_term_file):
+                    changes = term_structure_changes(pd.read_parquet(prev_term_file), term_structure)
+                    changes['prev_trading_date'] = prev_date.strftime('%Y-%m-%d')
+                    changes_file = os.path.join(folder_path, 'term_structure_changes.csv')
+                    changes.to_csv(changes_file, index=False)
+                    print(f"Term structure changes saved to {changes_file}")
+        except Exception as e:
+            print(f"Error building volatility term structure: {e}")
     
     # Report any failures
     if failed_tickers:
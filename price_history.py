@@ -0,0 +1,168 @@
+# price_history.py - Append-only yearly price history store
+#
+# Layout: <base_dir>/<year>/price_history/
+#     <YYYY-MM-DD>_<run_type>.parquet   one file per run, replaced atomically on re-runs
+#     compacted.parquet                 earlier runs folded into a single file
+#
+# Each run writes only its own rows. Readers layer run files over the compacted
+# file (and the legacy price_data_history.parquet), newest wins per
+# trading_date/run_type, so a crash at any point never loses or duplicates a run.
+# main.py reads the previous evening's prices back with load_previous_run_prices
+# for the statistical indicator comparison.
+
+import os
+from glob import glob
+
+import pandas as pd
+
+# Fold run files into compacted.parquet once a year has this many of them
+PRICE_HISTORY_COMPACT_AFTER = 40
+
+def get_price_history_dir(year, base_dir='options_data', test_mode=False):
+    """
+    Directory holding a year's price history
+
+    Args:
+        year (int or str): Calendar year
+        base_dir (str): Base data directory
+        test_mode (bool): If True, use the test directory instead
+
+    Returns:
+        str: Price history directory
+    """
+    if test_mode:
+        base_dir = base_dir.replace('options_data', 'options_data_test')
+    return os.path.join(base_dir, str(year), 'price_history')
+
+def _write_atomic(df, filepath):
+    tmp_path = filepath + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, filepath)
+
+def append_price_history(price_df, trading_date, run_type, base_dir='options_data', test_mode=False):
+    """
+    Store one run's price rows, replacing any earlier save of the same run
+
+    Args:
+        price_df (DataFrame): Price records for the run
+        trading_date (datetime): Trading session date
+        run_type (str): 'morning' or 'evening'
+        base_dir (str): Base data directory
+        test_mode (bool): If True, use the test directory instead
+
+    Returns:
+        str: Path to the run's file
+    """
+    history_dir = get_price_history_dir(trading_date.strftime('%Y'), base_dir, test_mode)
+    os.makedirs(history_dir, exist_ok=True)
+
+    run_df = price_df.assign(trading_date=trading_date.strftime('%Y-%m-%d'), run_type=run_type)
+    filepath = os.path.join(history_dir, f"{trading_date.strftime('%Y-%m-%d')}_{run_type}.parquet")
+    _write_atomic(run_df, filepath)
+    return filepath
+
+def _history_layers(year, base_dir, test_mode):
+    """Oldest to newest: legacy yearly file, compacted file, run files"""
+    history_dir = get_price_history_dir(year, base_dir, test_mode)
+    legacy_file = os.path.join(os.path.dirname(history_dir), 'price_data_history.parquet')
+    compacted_file = os.path.join(history_dir, 'compacted.parquet')
+    run_files = sorted(f for f in glob(os.path.join(history_dir, '*.parquet')) if f != compacted_file)
+    layers = [f for f in (legacy_file, compacted_file) if os.path.exists(f)]
+    return layers + run_files, legacy_file, compacted_file, run_files
+
+def _merge_layers(files, tickers=None):
+    """Concatenate layers, keeping only the newest layer's rows for each run"""
+    frames = []
+    for filepath in files:
+        filters = [('ticker', 'in', list(tickers))] if tickers is not None else None
+        frames.append(pd.read_parquet(filepath, filters=filters))
+    if not frames:
+        return pd.DataFrame()
+
+    # Newest layer first: a run's rows are taken from the first layer that has them
+    seen = set()
+    kept = []
+    for df in reversed(frames):
+        if df.empty:
+            continue
+        keys = df['trading_date'].astype(str) + '_' + df['run_type'].astype(str)
+        kept.append(df[~keys.isin(seen)])
+        seen.update(keys.unique())
+    if not kept:
+        return frames[0].iloc[:0]
+    return pd.concat(reversed(kept), ignore_index=True)
+
+def load_price_history(year, tickers=None, base_dir='options_data', test_mode=False):
+    """
+    Load a year's price history
+
+    Args:
+        year (int or str): Calendar year
+        tickers (list, optional): Only load these tickers
+        base_dir (str): Base data directory
+        test_mode (bool): If True, use the test directory instead
+
+    Returns:
+        DataFrame: One row per ticker and run, oldest run first
+    """
+    files, _, _, _ = _history_layers(year, base_dir, test_mode)
+    return _merge_layers(files, tickers)
+
+def load_previous_run_prices(trading_date, run_type='evening', tickers=None, base_dir='options_data', test_mode=False):
+    """
+    Load the prices of the latest run of a type before a trading date
+
+    Looks back across weekends, holidays and missed runs, and into the
+    previous year's history at the start of a year.
+
+    Args:
+        trading_date (datetime): Current trading session date
+        run_type (str): 'morning' or 'evening'
+        tickers (list, optional): Only load these tickers
+        base_dir (str): Base data directory
+        test_mode (bool): If True, use the test directory instead
+
+    Returns:
+        DataFrame: That run's price rows, or None if there is no earlier run
+    """
+    date_str = trading_date.strftime('%Y-%m-%d')
+    for year in (trading_date.year, trading_date.year - 1):
+        history = load_price_history(year, tickers, base_dir, test_mode)
+        if history.empty:
+            continue
+        dates = history['trading_date'].astype(str)
+        earlier = (history['run_type'].astype(str) == run_type) & (dates < date_str)
+        if earlier.any():
+            latest = dates[earlier].max()
+            return history[earlier & (dates == latest)].reset_index(drop=True)
+    return None
+
+def compact_price_history(year, min_files=0, base_dir='options_data', test_mode=False):
+    """
+    Fold a year's run files (and the legacy yearly file) into compacted.parquet
+
+    The compacted file is written under a temporary name and moved into
+    place before any run file is removed, so an interrupted compaction only
+    leaves rows that readers already de-duplicate.
+
+    Args:
+        year (int or str): Calendar year
+        min_files (int): Only compact once there are at least this many run files
+        base_dir (str): Base data directory
+        test_mode (bool): If True, use the test directory instead
+
+    Returns:
+        str: Path to compacted.parquet, or None if nothing was compacted
+    """
+    files, legacy_file, compacted_file, run_files = _history_layers(year, base_dir, test_mode)
+    if not run_files or len(run_files) < min_files:
+        return None
+
+    history = _merge_layers(files)
+    _write_atomic(history, compacted_file)
+
+    for filepath in run_files:
+        os.remove(filepath)
+    if os.path.exists(legacy_file):
+        os.remove(legacy_file)
+    return compacted_file
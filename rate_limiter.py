@@ -0,0 +1,124 @@
+# rate_limiter.py - Shared token-bucket throttle for all yfinance requests
+
+import os
+import threading
+import time
+from collections import deque
+
+class TokenBucketRateLimiter:
+    """
+    Thread-safe token bucket that adapts its refill rate to the error rate
+
+    Every request takes one token. Tokens refill at `rate` per second up to
+    `burst`. When the share of failed requests in the recent window crosses
+    `error_threshold` the rate is cut by `slowdown_factor`, and it creeps back
+    towards the configured rate on each success.
+
+    Args:
+        requests_per_second (float): Target request rate
+        burst (int): Maximum number of requests that may be sent back-to-back
+        min_rate (float): Floor for the adaptive rate
+        error_window (int): Number of recent requests used to measure the error rate
+        error_threshold (float): Error share that triggers a slowdown
+        slowdown_factor (float): Multiplier applied to the rate on a slowdown
+        recovery_step (float): Fraction of the target rate restored per success
+    """
+    def __init__(self, requests_per_second=4.0, burst=8, min_rate=0.25,
+                 error_window=20, error_threshold=0.25, slowdown_factor=0.5,
+                 recovery_step=0.05):
+        self.min_rate = min_rate
+        self.error_window = error_window
+        self.error_threshold = error_threshold
+        self.slowdown_factor = slowdown_factor
+        self.recovery_step = recovery_step
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=error_window)
+        self.configure(requests_per_second, burst)
+
+    def configure(self, requests_per_second=None, burst=None):
+        """
+        Change the target rate and/or burst size, resetting the adaptive state
+
+        Args:
+            requests_per_second (float, optional): New target request rate
+            burst (int, optional): New maximum burst size
+        """
+        with self._lock:
+            if requests_per_second is not None:
+                self.target_rate = float(requests_per_second)
+            if burst is not None:
+                self.burst = max(1, int(burst))
+            self.rate = self.target_rate
+            self._tokens = float(self.burst)
+            self._last_refill = time.monotonic()
+            self._outcomes.clear()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """
+        Block until a request token is available, then consume it
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
+            waited += wait_time
+
+    def record_success(self):
+        """Record a successful request and recover towards the target rate"""
+        with self._lock:
+            self._outcomes.append(False)
+            if self.rate < self.target_rate:
+                self.rate = min(self.target_rate, self.rate + self.recovery_step * self.target_rate)
+
+    def record_error(self, throttled=False):
+        """
+        Record a failed request and slow down globally if errors are spiking
+
+        Args:
+            throttled (bool): True if the server explicitly rate limited us,
+                which triggers a slowdown immediately
+        """
+        with self._lock:
+            self._outcomes.append(True)
+            errors = sum(self._outcomes)
+            spiking = (len(self._outcomes) >= min(5, self.error_window)
+                       and errors / len(self._outcomes) >= self.error_threshold)
+            if throttled or spiking:
+                new_rate = max(self.min_rate, self.rate * self.slowdown_factor)
+                if new_rate < self.rate:
+                    print(f"Rate limiter: slowing down from {self.rate:.2f} to {new_rate:.2f} requests/s")
+                self.rate = new_rate
+                # Drain the bucket and start a fresh window so one spike only
+                # counts once
+                self._tokens = min(self._tokens, 0.0)
+                self._outcomes.clear()
+
+# Shared limiter used by every yfinance call in data_collection.py
+rate_limiter = TokenBucketRateLimiter(
+    requests_per_second=float(os.environ.get('YF_REQUESTS_PER_SECOND', 4.0)),
+    burst=int(os.environ.get('YF_BURST', 8))
+)
+
+def configure_rate_limiter(requests_per_second=None, burst=None):
+    """
+    Configure the shared yfinance rate limiter
+
+    Args:
+        requests_per_second (float, optional): Target request rate
+        burst (int, optional): Maximum number of back-to-back requests
+    """
+    rate_limiter.configure(requests_per_second, burst)
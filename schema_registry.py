@@ -0,0 +1,199 @@
+# schema_registry.py - Versioned schemas for the Parquet files written by the collector
+#
+# raw_options.parquet versions:
+#   1  pandas-written files: strings and float64 throughout, a pandas index
+#      column, no contract_id and (in the oldest files) no trading_date
+#   2  RAW_OPTIONS_SCHEMA: contract_id, float32 quote columns, dictionary-encoded
+#      string columns and a date32 trading_date
+#
+# Writers stamp the version into the file's schema metadata. Files at an older
+# version are brought up to date by migrate_raw_options_table on read, or
+# rewritten once with migrate_raw_options_files.
+
+import os
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from utils import contract_ids
+
+RAW_OPTIONS_SCHEMA_VERSION = 2
+
+SCHEMA_VERSION_KEY = b'raw_options_schema_version'
+
+# Dictionary-encoded string type used for the categorical raw columns
+DICTIONARY_STRING = pa.dictionary(pa.int32(), pa.string())
+
+# Fixed column layout of raw_options.parquet (yfinance chain columns + run metadata),
+# using the same compact types as data_collection.apply_snapshot_schema
+RAW_OPTIONS_SCHEMA = pa.schema([
+    ('contractSymbol', pa.string()),
+    ('contract_id', pa.int64()),
+    ('lastTradeDate', pa.timestamp('ns', tz='UTC')),
+    ('strike', pa.float64()),
+    ('lastPrice', pa.float64()),
+    ('bid', pa.float64()),
+    ('ask', pa.float64()),
+    ('change', pa.float32()),
+    ('percentChange', pa.float32()),
+    ('volume', pa.float32()),
+    ('openInterest', pa.float32()),
+    ('impliedVolatility', pa.float32()),
+    ('inTheMoney', pa.bool_()),
+    ('contractSize', DICTIONARY_STRING),
+    ('currency', DICTIONARY_STRING),
+    ('ticker', DICTIONARY_STRING),
+    ('expiration', DICTIONARY_STRING),
+    ('option_type', DICTIONARY_STRING),
+    ('timestamp', DICTIONARY_STRING),
+    ('run_type', DICTIONARY_STRING),
+    ('trading_date', pa.date32()),
+    ('underlying_price', pa.float64()),
+    ('prev_close', pa.float64()),
+], metadata={SCHEMA_VERSION_KEY: str(RAW_OPTIONS_SCHEMA_VERSION).encode()})
+
+def raw_options_schema_version(schema):
+    """
+    Schema version of a raw options file
+
+    Args:
+        schema (pa.Schema): Schema read from the file
+
+    Returns:
+        int: The stamped version; unstamped files already in the current
+            layout count as current, anything else as version 1
+    """
+    metadata = schema.metadata or {}
+    if SCHEMA_VERSION_KEY in metadata:
+        return int(metadata[SCHEMA_VERSION_KEY])
+    if schema.remove_metadata().equals(RAW_OPTIONS_SCHEMA.remove_metadata()):
+        return RAW_OPTIONS_SCHEMA_VERSION
+    return 1
+
+def conform_to_schema(columns, num_rows, schema=RAW_OPTIONS_SCHEMA):
+    """
+    Build a table in the schema's column order and types
+
+    Args:
+        columns (dict): Column name -> Arrow array, chunked array or pandas Series
+        num_rows (int): Number of rows
+        schema (pa.Schema): Target schema
+
+    Returns:
+        pa.Table: Table with exactly the schema's columns; missing ones are null
+    """
+    arrays = []
+    for field in schema:
+        column = columns.get(field.name)
+        if column is None:
+            arrays.append(pa.nulls(num_rows, field.type))
+            continue
+        if not isinstance(column, (pa.Array, pa.ChunkedArray)):
+            column = pa.array(column, from_pandas=True)
+        arrays.append(column if column.type == field.type else column.cast(field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def migrate_raw_options_table(table, trading_date=None):
+    """
+    Bring a raw options table read from any version up to RAW_OPTIONS_SCHEMA
+
+    Args:
+        table (pa.Table): Table read from a raw_options.parquet file
+        trading_date (datetime, optional): Trading date of the file, used
+            where the file has none
+
+    Returns:
+        pa.Table: Table in RAW_OPTIONS_SCHEMA (returned as-is if already current)
+    """
+    if raw_options_schema_version(table.schema) == RAW_OPTIONS_SCHEMA_VERSION:
+        return table.replace_schema_metadata(RAW_OPTIONS_SCHEMA.metadata)
+
+    # Version 1 -> 2
+    columns = {name: table.column(name) for name in table.column_names
+               if not name.startswith('__index_level_')}
+    if 'contract_id' not in columns and 'contractSymbol' in columns:
+        symbols = columns['contractSymbol'].to_numpy(zero_copy_only=False)
+        columns['contract_id'] = pa.array(contract_ids(symbols), pa.int64())
+    if trading_date is not None:
+        if isinstance(trading_date, datetime):
+            trading_date = trading_date.date()
+        path_date = pa.repeat(pa.scalar(trading_date, pa.date32()), table.num_rows)
+        if 'trading_date' not in columns:
+            columns['trading_date'] = path_date
+        else:
+            columns['trading_date'] = pc.fill_null(columns['trading_date'].cast(pa.date32()), path_date)
+    return conform_to_schema(columns, table.num_rows)
+
+def read_raw_options(file_path, trading_date=None):
+    """
+    Read a raw options file in RAW_OPTIONS_SCHEMA, migrating older versions in memory
+
+    Args:
+        file_path (str): raw_options.parquet path
+        trading_date (datetime, optional): Trading date of the file
+
+    Returns:
+        pa.Table: Table in RAW_OPTIONS_SCHEMA
+    """
+    return migrate_raw_options_table(pq.read_table(file_path), trading_date)
+
+def migrate_raw_options_file(file_path, trading_date=None):
+    """
+    Rewrite an older raw options file in the current schema
+
+    The new file is written under a temporary name and moved into place.
+
+    Args:
+        file_path (str): raw_options.parquet path
+        trading_date (datetime, optional): Trading date of the file
+
+    Returns:
+        bool: True if the file was rewritten, False if it was already current
+    """
+    if raw_options_schema_version(pq.read_schema(file_path)) == RAW_OPTIONS_SCHEMA_VERSION:
+        return False
+
+    table = read_raw_options(file_path, trading_date)
+    tmp_path = file_path + '.tmp'
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, file_path)
+    return True
+
+def migrate_raw_options_files(base_dir='options_data'):
+    """
+    Rewrite every older raw_options.parquet under the year/month/week/day/run_type folders
+
+    Args:
+        base_dir (str): Root of the nested folder layout
+
+    Returns:
+        int: Number of files rewritten
+    """
+    migrated = 0
+    for root, _, files in os.walk(base_dir):
+        if 'raw_options.parquet' not in files:
+            continue
+        file_path = os.path.join(root, 'raw_options.parquet')
+        # Trading date from the folder path, for files without a trading_date column
+        parts = root.split(os.path.sep)
+        trading_date = None
+        if len(parts) >= 5:
+            year, month, _, day, _ = parts[-5:]
+            try:
+                trading_date = datetime(int(year), int(month), int(day))
+            except ValueError:
+                pass
+        try:
+            if migrate_raw_options_file(file_path, trading_date):
+                migrated += 1
+                print(f"Migrated {file_path}")
+        except Exception as e:
+            print(f"Error migrating {file_path}: {e}")
+    return migrated
+
+if __name__ == "__main__":
+    for base_dir in ('options_data', 'options_data_test'):
+        count = migrate_raw_options_files(base_dir)
+        print(f"Migrated {count} raw options files in {base_dir}")
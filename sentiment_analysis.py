@@ -1,35 +1,77 @@
-# sentiment_analysis.py - Overnight and daily sentiment comparisons
+# sentiment_analysis.py - Overnight, daily and multi-window sentiment comparisons
 
 import pandas as pd
 import numpy as np
 
-def analyze_overnight_changes(evening_df, morning_df):
+from utils import contract_ids
+
+# Key used to match contracts in snapshots that predate contract_id
+CONTRACT_KEY_COLUMNS = ['ticker', 'strike', 'expiration', 'option_type']
+
+def _contract_keys(df, use_ids):
+    """Contract key per row: contract_id (derived from contractSymbol if missing) or the four-column key"""
+    if not use_ids:
+        return pd.MultiIndex.from_frame(df[CONTRACT_KEY_COLUMNS])
+    if 'contract_id' in df.columns:
+        return pd.Index(df['contract_id'].to_numpy())
+    return pd.Index(contract_ids(df['contractSymbol']))
+
+def _align_snapshot(reference_df, current_df, reference_keys, current_keys, use_ids, suffixes):
     """
-    Compare evening vs morning data to detect overnight changes in sentiment
+    Pair every reference contract with the same contract in the current snapshot
+    
+    The current snapshot's keys are built once by compare_snapshots; each
+    reference is matched to them with one get_indexer lookup and both sides
+    are gathered by position, so the current frame is never re-merged. The
+    result has the same layout as an inner merge on the contract key: the
+    reference columns first, then the current columns, with overlapping
+    value columns suffixed.
+    """
+    key_columns = CONTRACT_KEY_COLUMNS + (['contract_id'] if use_ids else [])
+    
+    if not current_keys.is_unique:
+        # Duplicate contracts in the current snapshot: pair every match with a regular join
+        left = reference_df if not use_ids or 'contract_id' in reference_df.columns else reference_df.assign(contract_id=reference_keys)
+        right = current_df if not use_ids or 'contract_id' in current_df.columns else current_df.assign(contract_id=current_keys)
+        if use_ids:
+            right = right.drop(columns=[col for col in CONTRACT_KEY_COLUMNS if col in right.columns])
+        return left.merge(right, on='contract_id' if use_ids else CONTRACT_KEY_COLUMNS, suffixes=suffixes)
+    
+    positions = current_keys.get_indexer(reference_keys)
+    matched = positions >= 0
+    
+    left = reference_df.iloc[np.flatnonzero(matched)].reset_index(drop=True)
+    if use_ids and 'contract_id' not in left.columns:
+        left['contract_id'] = reference_keys[matched]
+    right = current_df.iloc[positions[matched]].reset_index(drop=True)
+    right = right.drop(columns=[col for col in key_columns if col in right.columns])
+    
+    overlap = left.columns.intersection(right.columns)
+    left = left.rename(columns={col: col + suffixes[0] for col in overlap})
+    right = right.rename(columns={col: col + suffixes[1] for col in overlap})
+    return pd.concat([left, right], axis=1)
+
+def _summarize_changes(merged, reference_suffix, current_suffix):
+    """
+    Contract-level changes and the per-ticker sentiment summary for one comparison
     
     Args:
-        evening_df (DataFrame): Evening options data
-        morning_df (DataFrame): Morning options data
+        merged (DataFrame): Aligned reference/current contracts
+        reference_suffix (str): Suffix of the reference snapshot's columns
+        current_suffix (str): Suffix of the current snapshot's columns
         
     Returns:
         tuple: (merged_data, ticker_summary, volume_factor)
     """
-    # Ensure we're comparing the same options
-    common_columns = ['ticker', 'strike', 'expiration', 'option_type']
-    
-    # Merge the dataframes
-    merged = evening_df.merge(
-        morning_df,
-        on=common_columns,
-        suffixes=('_evening', '_morning')
-    )
+    ref_oi = f'openInterest{reference_suffix}'
+    current_volume = f'volume{current_suffix}'
     
     # Calculate changes in IV and pricing
-    merged['iv_change'] = merged['impliedVolatility_morning'] - merged['impliedVolatility_evening']
-    merged['iv_change_pct'] = (merged['iv_change'] / merged['impliedVolatility_evening']) * 100
+    merged['iv_change'] = merged[f'impliedVolatility{current_suffix}'] - merged[f'impliedVolatility{reference_suffix}']
+    merged['iv_change_pct'] = (merged['iv_change'] / merged[f'impliedVolatility{reference_suffix}']) * 100
     
-    merged['price_change'] = merged['lastPrice_morning'] - merged['lastPrice_evening']
-    merged['price_change_pct'] = (merged['price_change'] / merged['lastPrice_evening']) * 100
+    merged['price_change'] = merged[f'lastPrice{current_suffix}'] - merged[f'lastPrice{reference_suffix}']
+    merged['price_change_pct'] = (merged['price_change'] / merged[f'lastPrice{reference_suffix}']) * 100
     
     # Calculate sentiment scores
     # For calls: IV and price increase = bullish, decrease = bearish
@@ -40,27 +82,27 @@ def analyze_overnight_changes(evening_df, morning_df):
         -merged['price_change_pct']  # Put price up = bearish
     )
     
-    # Add volume-weighted component if morning data has volume
-    if 'volume_morning' in merged.columns and merged['volume_morning'].sum() > 0:
-        # Morning volume indicates activity - weight score by volume
-        merged['weighted_score'] = merged['sentiment_score'] * merged['volume_morning']
+    # Add volume-weighted component if the current data has volume
+    if current_volume in merged.columns and merged[current_volume].sum() > 0:
+        # Current volume indicates activity - weight score by volume
+        merged['weighted_score'] = merged['sentiment_score'] * merged[current_volume]
         volume_factor = True
     else:
-        # No volume data - use open interest from evening as weighting
-        merged['weighted_score'] = merged['sentiment_score'] * merged['openInterest_evening']
+        # No volume data - use open interest from the reference as weighting
+        merged['weighted_score'] = merged['sentiment_score'] * merged[ref_oi]
         volume_factor = False
     
     # Summarize by ticker
-    ticker_summary = merged.groupby('ticker').agg({
+    ticker_summary = merged.groupby('ticker', observed=True).agg({
         'weighted_score': 'sum',
         'sentiment_score': 'mean',
         'iv_change': 'mean',
         'price_change_pct': 'mean',
-        'openInterest_evening': 'sum',
+        ref_oi: 'sum',
     }).reset_index()
     
     # Normalize by open interest
-    ticker_summary['normalized_score'] = ticker_summary['weighted_score'] / ticker_summary['openInterest_evening']
+    ticker_summary['normalized_score'] = ticker_summary['weighted_score'] / ticker_summary[ref_oi]
     ticker_summary['sentiment'] = np.where(ticker_summary['normalized_score'] > 0, 'BULLISH', 'BEARISH')
     ticker_summary['normalized_score'] = ticker_summary['normalized_score'] * 100
     
@@ -73,6 +115,60 @@ def analyze_overnight_changes(evening_df, morning_df):
 
     return merged, ticker_summary, volume_factor
 
+def _compare_with_reference(current_df, reference_df, suffixes, current_keys):
+    """Align and summarize one reference snapshot, reusing the cached current keys"""
+    current_has_ids = 'contract_id' in current_df.columns or 'contractSymbol' in current_df.columns
+    use_ids = current_has_ids and ('contract_id' in reference_df.columns or 'contractSymbol' in reference_df.columns)
+    if use_ids not in current_keys:
+        current_keys[use_ids] = _contract_keys(current_df, use_ids)
+    
+    merged = _align_snapshot(reference_df, current_df, _contract_keys(reference_df, use_ids),
+                             current_keys[use_ids], use_ids, suffixes)
+    return _summarize_changes(merged, *suffixes)
+
+def compare_snapshots(current_df, references):
+    """
+    Compare one snapshot against any number of reference snapshots in one pass
+    
+    Contracts are matched on contract_id (derived from contractSymbol for
+    older files), falling back to ticker/strike/expiration/option_type when a
+    frame has no contract symbols. The current snapshot's key index is built
+    once and shared by every reference. A reference that fails to compare is
+    reported and left out; the other windows are still returned.
+    
+    Args:
+        current_df (DataFrame): Current options data
+        references (dict): name -> (reference_df, (reference_suffix, current_suffix)),
+            e.g. {'overnight': (evening_df, ('_evening', '_morning'))}
+        
+    Returns:
+        dict: name -> (merged_data, ticker_summary, volume_factor) for every
+            reference that compared successfully
+    """
+    current_keys = {}
+    results = {}
+    
+    for name, (reference_df, suffixes) in references.items():
+        try:
+            results[name] = _compare_with_reference(current_df, reference_df, suffixes, current_keys)
+        except Exception as e:
+            print(f"Error comparing with {name} reference data: {e}")
+    
+    return results
+
+def analyze_overnight_changes(evening_df, morning_df):
+    """
+    Compare evening vs morning data to detect overnight changes in sentiment
+    
+    Args:
+        evening_df (DataFrame): Evening options data
+        morning_df (DataFrame): Morning options data
+        
+    Returns:
+        tuple: (merged_data, ticker_summary, volume_factor)
+    """
+    return _compare_with_reference(morning_df, evening_df, ('_evening', '_morning'), {})
+
 def analyze_daily_changes(previous_day_df, current_day_df):
     """
     Compare previous day's close vs current day's close data to detect day-to-day changes in sentiment
@@ -84,64 +180,7 @@ def analyze_daily_changes(previous_day_df, current_day_df):
     Returns:
         tuple: (merged_data, ticker_summary, volume_factor)
     """
-    # Ensure we're comparing the same options
-    common_columns = ['ticker', 'strike', 'expiration', 'option_type']
-    
-    # Merge the dataframes
-    merged = previous_day_df.merge(
-        current_day_df,
-        on=common_columns,
-        suffixes=('_previous', '_current')
-    )
-    
-    # Calculate changes in IV and pricing
-    merged['iv_change'] = merged['impliedVolatility_current'] - merged['impliedVolatility_previous']
-    merged['iv_change_pct'] = (merged['iv_change'] / merged['impliedVolatility_previous']) * 100
-    
-    merged['price_change'] = merged['lastPrice_current'] - merged['lastPrice_previous']
-    merged['price_change_pct'] = (merged['price_change'] / merged['lastPrice_previous']) * 100
-    
-    # Calculate sentiment scores
-    # For calls: IV and price increase = bullish, decrease = bearish
-    # For puts: IV and price increase = bearish, decrease = bullish
-    merged['sentiment_score'] = np.where(
-        merged['option_type'] == 'call',
-        merged['price_change_pct'],  # Call price up = bullish
-        -merged['price_change_pct']  # Put price up = bearish
-    )
-    
-    # Add volume-weighted component if current data has volume
-    if 'volume_current' in merged.columns and merged['volume_current'].sum() > 0:
-        # Current volume indicates activity - weight score by volume
-        merged['weighted_score'] = merged['sentiment_score'] * merged['volume_current']
-        volume_factor = True
-    else:
-        # No volume data - use open interest from previous as weighting
-        merged['weighted_score'] = merged['sentiment_score'] * merged['openInterest_previous']
-        volume_factor = False
-    
-    # Summarize by ticker
-    ticker_summary = merged.groupby('ticker').agg({
-        'weighted_score': 'sum',
-        'sentiment_score': 'mean',
-        'iv_change': 'mean',
-        'price_change_pct': 'mean',
-        'openInterest_previous': 'sum',
-    }).reset_index()
-    
-    # Normalize by open interest
-    ticker_summary['normalized_score'] = ticker_summary['weighted_score'] / ticker_summary['openInterest_previous']
-    ticker_summary['sentiment'] = np.where(ticker_summary['normalized_score'] > 0, 'BULLISH', 'BEARISH')
-    ticker_summary['normalized_score'] = ticker_summary['normalized_score'] * 100
-    
-    # Sort from most bullish to most bearish
-    ticker_summary = ticker_summary.sort_values('normalized_score', ascending=False)
-    
-    # Scale the normalized scores to match the original scale
-    scaling_factor = 100  # Adjust this value if needed
-    ticker_summary['normalized_score'] = ticker_summary['normalized_score'] * scaling_factor
-
-    return merged, ticker_summary, volume_factor
+    return _compare_with_reference(current_day_df, previous_day_df, ('_previous', '_current'), {})
 
 def analyze_statistical_indicators(prev_price_df, curr_price_df, statistical_tickers):
     """
@@ -3,7 +3,7 @@
 import os
 import pandas as pd
 from datetime import datetime, timedelta
-from sentiment_analysis import analyze_overnight_changes, analyze_daily_changes
+from sentiment_analysis import compare_snapshots
 from dashboard import create_overnight_dashboard, create_daily_dashboard
 
 # Define dates (today and yesterday)
@@ -40,11 +40,17 @@ if not os.path.exists(yesterday_file):
 
 # Load data
 today_df = pd.read_parquet(today_file)
-yesterday_df = pd.read_parquet(yesterday_file)
+references = {'daily': (pd.read_parquet(yesterday_file), ('_previous', '_current'))}
 
-# Run sentiment analysis
-print("Analyzing daily changes...")
-merged_data, summary, _ = analyze_daily_changes(yesterday_df, today_df)
+# Also compare against this morning's snapshot when it exists
+today_morning_file = os.path.join('options_data', today_year, today_month, today_week, today_day, 'morning', 'vol_surface.parquet')
+if run_type == "evening" and os.path.exists(today_morning_file):
+    references['intraday'] = (pd.read_parquet(today_morning_file), ('_morning', '_evening'))
+
+# Run sentiment analysis against every reference in one pass
+print(f"Analyzing {', '.join(references)} changes...")
+comparisons = compare_snapshots(today_df, references)
+merged_data, summary, _ = comparisons['daily']
 
 # Create and save dashboard
 dashboard_file = os.path.join(today_path, 'daily_sentiment_dashboard.txt')
@@ -52,6 +58,7 @@ create_daily_dashboard(summary, dashboard_file)
 
 # Save detailed analysis
 merged_data.to_parquet(os.path.join(today_path, 'daily_analysis.parquet'))
-summary.to_csv(os.path.join(today_path, 'daily_sentiment_summary.csv'))
+for name, (_, comparison_summary, _) in comparisons.items():
+    comparison_summary.to_csv(os.path.join(today_path, f'{name}_sentiment_summary.csv'))
 
 print(f"Sentiment analysis completed. Results saved to {today_path}")
\ No newline at end of file
@@ -0,0 +1,316 @@
+# snapshot_dataset.py - Hive-partitioned Parquet datasets for options snapshots
+#
+# Layout: <base_dir>/<dataset>/date=YYYY-MM-DD/run_type=<run>/ticker_bucket=NN/part-0.parquet
+#
+# Every run writes its own date/run_type partition, with tickers hashed into a
+# fixed number of buckets so a day holds a handful of files rather than one per
+# ticker. Readers only open the partitions matching the requested dates, run
+# types and tickers.
+#
+# The nested options_data folders stay the source of truth (and are what the
+# workflow commits); the dataset is a local build artifact that can be rebuilt
+# from them at any time by running this module.
+
+import os
+import shutil
+import tempfile
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from schema_registry import read_raw_options
+
+DATASET_BASE_DIR = 'options_dataset'
+
+# Changing the bucket count changes where tickers live; existing datasets must
+# be rewritten (import_legacy_snapshots) after changing it
+TICKER_BUCKETS = 16
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('date', pa.date32()), ('run_type', pa.string()), ('ticker_bucket', pa.int32())]),
+    flavor='hive'
+)
+
+def get_dataset_path(dataset, base_dir=DATASET_BASE_DIR, test_mode=False):
+    """
+    Root directory of a snapshot dataset
+
+    Args:
+        dataset (str): Dataset name, e.g. 'raw_options' or 'vol_surface'
+        base_dir (str): Base directory for all datasets
+        test_mode (bool): If True, use the test directory instead
+
+    Returns:
+        str: Dataset root directory
+    """
+    if test_mode:
+        base_dir = base_dir.replace('options_dataset', 'options_dataset_test')
+    return os.path.join(base_dir, dataset)
+
+def ticker_buckets(tickers, n_buckets=TICKER_BUCKETS):
+    """
+    Stable bucket number per ticker (CRC32 of the symbol), hashed once per unique ticker
+
+    Args:
+        tickers (array-like): Ticker symbols
+        n_buckets (int): Number of buckets
+
+    Returns:
+        ndarray: int32 bucket per entry
+    """
+    codes, uniques = pd.factorize(np.asarray(tickers, dtype=object))
+    buckets = np.array([zlib.crc32(str(t).encode()) % n_buckets for t in uniques], dtype=np.int32)
+    return buckets[codes]
+
+def write_snapshot_dataset(data, dataset, trading_date, run_type, base_dir=DATASET_BASE_DIR, test_mode=False):
+    """
+    Write one run's snapshot into its date/run_type partition
+
+    Re-running the same date and run_type replaces that run's whole
+    partition (every ticker bucket), so writes are idempotent; other runs
+    are never touched.
+
+    Args:
+        data (DataFrame, pa.Table or str): Snapshot rows with a ticker column,
+            or the path of a snapshot Parquet file (streamed in record
+            batches, so memory stays flat for large files)
+        dataset (str): Dataset name
+        trading_date (datetime): Trading session date
+        run_type (str): 'morning' or 'evening'
+        base_dir (str): Base directory for all datasets
+        test_mode (bool): If True, use the test directory instead
+
+    Returns:
+        str: Path of the run's partition directory
+    """
+    root = get_dataset_path(dataset, base_dir, test_mode)
+    if isinstance(trading_date, datetime):
+        trading_date = trading_date.date()
+
+    if isinstance(data, str):
+        parquet_file = pq.ParquetFile(data)
+        data = _map_batches(parquet_file.iter_batches(), parquet_file.schema_arrow,
+                            lambda table: _run_columns(table, trading_date, run_type))
+    else:
+        table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+        data = _run_columns(table, trading_date, run_type)
+
+    write_snapshot_runs(data, dataset, base_dir, test_mode)
+    return os.path.join(root, f"date={trading_date.isoformat()}", f"run_type={run_type}")
+
+def _set_column(table, name, column):
+    if name in table.column_names:
+        return table.set_column(table.schema.get_field_index(name), name, column)
+    return table.append_column(name, column)
+
+def _map_batches(batches, schema, transform):
+    """Stream record batches through a table transform without materializing them"""
+    def transformed():
+        for batch in batches:
+            yield from transform(pa.Table.from_batches([batch], schema=schema)).to_batches()
+    return pa.RecordBatchReader.from_batches(transform(schema.empty_table()).schema, transformed())
+
+def _run_columns(table, trading_date, run_type):
+    """Drop stray pandas index columns and add one run's date and run_type columns"""
+    # Older snapshot files carry their pandas index as a column
+    table = table.drop([name for name in table.column_names if name.startswith('__index_level_')])
+    table = _set_column(table, 'date', pa.repeat(pa.scalar(trading_date, pa.date32()), table.num_rows))
+    return _set_column(table, 'run_type', pa.repeat(pa.scalar(run_type, pa.string()), table.num_rows))
+
+def _bucket_columns(table):
+    """Add the ticker_bucket partition column"""
+    tickers = table.column('ticker').to_pandas()
+    return _set_column(table, 'ticker_bucket', pa.array(ticker_buckets(tickers), pa.int32()))
+
+def write_snapshot_runs(data, dataset, base_dir=DATASET_BASE_DIR, test_mode=False):
+    """
+    Write rows holding any number of runs in a single pass
+
+    Rows are routed by their date (date32) and run_type columns. The data is
+    written to a staging directory first; each date/run_type partition it
+    produced then replaces the existing partition as a whole, so buckets
+    holding tickers that are no longer in a run do not survive a rewrite.
+    All other runs are left alone.
+
+    Args:
+        data (pa.Table or pa.RecordBatchReader): Snapshot rows with ticker,
+            date and run_type columns
+        dataset (str): Dataset name
+        base_dir (str): Base directory for all datasets
+        test_mode (bool): If True, use the test directory instead
+    """
+    root = get_dataset_path(dataset, base_dir, test_mode)
+    os.makedirs(root, exist_ok=True)
+
+    # Partition columns are stored in the directory names, not in the files
+    if isinstance(data, pa.Table):
+        data = _bucket_columns(data)
+    else:
+        data = _map_batches(data, data.schema, _bucket_columns)
+
+    # Staging directories start with '.', so readers never list them
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=root)
+    try:
+        ds.write_dataset(
+            data, staging, format='parquet', partitioning=PARTITIONING,
+            basename_template='part-{i}.parquet'
+        )
+        for date_dir in os.listdir(staging):
+            os.makedirs(os.path.join(root, date_dir), exist_ok=True)
+            for run_dir in os.listdir(os.path.join(staging, date_dir)):
+                target = os.path.join(root, date_dir, run_dir)
+                retired = None
+                if os.path.exists(target):
+                    retired = os.path.join(staging, f'.retired-{date_dir}-{run_dir}')
+                    os.replace(target, retired)
+                os.replace(os.path.join(staging, date_dir, run_dir), target)
+                if retired:
+                    shutil.rmtree(retired)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+def _partition_files(root, start_date=None, end_date=None, run_types=None, buckets=None):
+    """Files of the partitions matching the filters, found from directory names only"""
+    if not os.path.isdir(root):
+        return []
+
+    start = pd.Timestamp(start_date).date() if start_date is not None else None
+    end = pd.Timestamp(end_date).date() if end_date is not None else None
+
+    files = []
+    for date_dir in sorted(os.listdir(root)):
+        if not date_dir.startswith('date='):
+            continue
+        day = pd.Timestamp(date_dir[len('date='):]).date()
+        if (start and day < start) or (end and day > end):
+            continue
+
+        date_path = os.path.join(root, date_dir)
+        run_dirs = ([f"run_type={r}" for r in run_types] if run_types is not None
+                    else [d for d in sorted(os.listdir(date_path)) if d.startswith('run_type=')])
+        for run_dir in run_dirs:
+            run_path = os.path.join(date_path, run_dir)
+            if not os.path.isdir(run_path):
+                continue
+            bucket_dirs = ([f"ticker_bucket={b}" for b in buckets] if buckets is not None
+                           else [d for d in sorted(os.listdir(run_path)) if d.startswith('ticker_bucket=')])
+            for bucket_dir in bucket_dirs:
+                bucket_path = os.path.join(run_path, bucket_dir)
+                if os.path.isdir(bucket_path):
+                    files.extend(os.path.join(bucket_path, f) for f in sorted(os.listdir(bucket_path))
+                                 if f.endswith('.parquet'))
+    return files
+
+def _unified_schema(files):
+    """
+    One schema for files written at different schema versions
+
+    The newest file's types win (older columns are cast on read, e.g. string
+    to dictionary or float64 to float32) and columns only found in older files
+    are appended.
+    """
+    schemas = [pq.read_schema(f) for f in files]
+    fields = list(schemas[-1])
+    names = set(schemas[-1].names)
+    for schema in reversed(schemas[:-1]):
+        for field in schema:
+            if field.name not in names:
+                fields.append(field)
+                names.add(field.name)
+    return pa.schema([f for f in fields if f.name not in PARTITIONING.schema.names])
+
+def load_snapshots(dataset, tickers=None, start_date=None, end_date=None, run_types=None,
+                   columns=None, base_dir=DATASET_BASE_DIR, test_mode=False, as_table=False):
+    """
+    Load snapshot rows, opening only the partitions that can match
+
+    Dates, run types and ticker buckets are pruned from the directory names
+    before any file is opened; tickers are then filtered inside the bucket
+    files. For example, AAPL evenings for the last 30 days read one bucket
+    file per evening.
+
+    Args:
+        dataset (str): Dataset name
+        tickers (list, optional): Only these tickers
+        start_date (date-like, optional): First trading date (inclusive)
+        end_date (date-like, optional): Last trading date (inclusive)
+        run_types (list, optional): Only these run types, e.g. ['evening']
+        columns (list, optional): Only these columns (partition columns
+            date, run_type and ticker_bucket are always available)
+        base_dir (str): Base directory for all datasets
+        test_mode (bool): If True, use the test directory instead
+        as_table (bool): Return a pyarrow Table instead of a DataFrame
+
+    Returns:
+        DataFrame or pa.Table: Matching rows (empty if nothing matches)
+    """
+    root = get_dataset_path(dataset, base_dir, test_mode)
+    if isinstance(run_types, str):
+        run_types = [run_types]
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    buckets = sorted(set(ticker_buckets(tickers).tolist())) if tickers is not None else None
+
+    files = _partition_files(root, start_date, end_date, run_types, buckets)
+    if not files:
+        table = pa.table({})
+        return table if as_table else table.to_pandas()
+
+    schema = pa.unify_schemas([_unified_schema(files), PARTITIONING.schema])
+    dataset_obj = ds.dataset(files, schema=schema, format='parquet',
+                             partitioning=PARTITIONING, partition_base_dir=root)
+    row_filter = pc.field('ticker').isin(list(tickers)) if tickers is not None else None
+    table = dataset_obj.to_table(columns=columns, filter=row_filter)
+    return table if as_table else table.to_pandas(date_as_object=False)
+
+def import_legacy_snapshots(base_dir='options_data', filename='raw_options.parquet', dataset='raw_options',
+                            dataset_base_dir=DATASET_BASE_DIR, test_mode=False):
+    """
+    Copy snapshots from the year/month/week/day/run_type folders into a dataset
+
+    raw_options.parquet files are read through schema_registry, so files
+    written before RAW_OPTIONS_SCHEMA are migrated on the way in. Importing
+    again replaces the earlier copy of each run.
+
+    Args:
+        base_dir (str): Root of the nested folder layout
+        filename (str): Snapshot file to import from each run folder
+        dataset (str): Dataset name to write
+        dataset_base_dir (str): Base directory for all datasets
+        test_mode (bool): If True, write to the test dataset directory
+
+    Returns:
+        int: Number of runs imported
+    """
+    imported = 0
+    for root, _, files in os.walk(base_dir):
+        if filename not in files:
+            continue
+        parts = root.split(os.path.sep)
+        if len(parts) < 5:
+            continue
+        year, month, _, day, run_type = parts[-5:]
+        try:
+            trading_date = datetime(int(year), int(month), int(day))
+            data = os.path.join(root, filename)
+            # Raw files from before the schema registry are migrated (contract_id,
+            # trading_date and compact types) so old and new partitions share types
+            if filename == 'raw_options.parquet':
+                data = read_raw_options(data, trading_date)
+            write_snapshot_dataset(data, dataset, trading_date, run_type, dataset_base_dir, test_mode)
+            imported += 1
+            print(f"Imported {os.path.join(root, filename)}")
+        except Exception as e:
+            print(f"Error importing {os.path.join(root, filename)}: {e}")
+    return imported
+
+if __name__ == "__main__":
+    for snapshot in ('raw_options', 'vol_surface'):
+        count = import_legacy_snapshots(filename=f'{snapshot}.parquet', dataset=snapshot)
+        print(f"Imported {count} {snapshot} runs into {get_dataset_path(snapshot)}")
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from build_options_db import build_options_master_database, update_options_master, load_options_master, load_manifest
+from schema_registry import conform_to_schema
+
+def _write_raw_file(path, tickers, run_type='evening'):
+    num_rows = 2 * len(tickers)
+    columns = {
+        'contractSymbol': pa.array([f'{t}250516C0010{i}000' for t in tickers for i in range(2)]),
+        'ticker': pa.array([t for t in tickers for _ in range(2)]),
+        'strike': pa.array([100.0, 101.0] * len(tickers)),
+        'expiration': pa.array(['2025-05-16'] * num_rows),
+        'run_type': pa.array([run_type] * num_rows),
+        'underlying_price': pa.array([100.0] * num_rows),
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(conform_to_schema(columns, num_rows), path)
+
+def test_changed_raw_file_replaces_its_run(tmp_path):
+    base_dir = str(tmp_path / 'options_data')
+    output_dir = str(tmp_path / 'options_db')
+    raw_file = os.path.join(base_dir, '2025', '05', 'W19', '13', 'evening', 'raw_options.parquet')
+    other_file = os.path.join(base_dir, '2025', '05', 'W19', '14', 'evening', 'raw_options.parquet')
+    _write_raw_file(raw_file, ['AAPL', 'MSFT', 'SPY', 'QQQ'])
+    _write_raw_file(other_file, ['SPY'])
+    update_options_master(base_dir, output_dir, max_workers=1)
+
+    _write_raw_file(raw_file, ['AAPL'])
+    os.utime(raw_file, (0, 0))
+    master = build_options_master_database(base_dir, output_dir, max_workers=1)
+
+    first_day = master[master['trading_date'] == '2025-05-13']
+    assert sorted(first_day['ticker'].astype(str).unique()) == ['AAPL']
+    assert (master['trading_date'] == '2025-05-14').sum() == 2
+    assert load_manifest(output_dir)['num_rows'].sum() == len(master)
+
+def test_legacy_master_is_conformed_and_seeds_the_manifest(tmp_path):
+    base_dir = str(tmp_path / 'options_data')
+    output_dir = str(tmp_path / 'options_db')
+    raw_file = os.path.join(base_dir, '2025', '05', 'W19', '13', 'evening', 'raw_options.parquet')
+    _write_raw_file(raw_file, ['AAPL', 'MSFT'])
+
+    # Old single-file master: pandas dtypes, datetime dates, no contract_id
+    legacy = pd.DataFrame({
+        'contractSymbol': ['AAPL250516C00100000', 'AAPL250516P00100000', 'SPY250516C00500000'],
+        'ticker': ['AAPL', 'AAPL', 'SPY'],
+        'strike': [100.0, 100.0, 500.0],
+        'volume': [10.0, 20.0, 30.0],
+        'expiration': pd.to_datetime(['2025-05-16'] * 3),
+        'trading_date': pd.to_datetime(['2025-05-13'] * 3),
+        'run_type': ['evening'] * 3,
+        'underlying_price': [100.0, 100.0, 500.0],
+        'path_info': ['2025/05/W19/13/evening'] * 3,
+    })
+    os.makedirs(output_dir)
+    legacy.to_parquet(os.path.join(output_dir, 'options_master.parquet'))
+
+    update_options_master(base_dir, output_dir, max_workers=1)
+
+    master = load_options_master(output_dir)
+    # The raw file for the imported run is not ingested on top of it
+    assert sorted(master['ticker'].astype(str)) == ['AAPL', 'AAPL', 'SPY']
+    assert master['contract_id'].dtype == np.int64
+    assert master['volume'].dtype == np.float32
+    assert (master['days_to_expiry'] == 3).all()
+    manifest = load_manifest(output_dir)
+    assert list(manifest.index) == [raw_file]
+    assert manifest['num_rows'].sum() == len(master)
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_collection import retry_with_backoff
+from rate_limiter import rate_limiter
+
+def _failing(error):
+    @retry_with_backoff(retries=0)
+    def fetch():
+        raise error
+    return fetch
+
+def test_only_network_and_throttling_errors_reach_the_limiter():
+    rate_limiter.configure()
+
+    with pytest.raises(Exception):
+        _failing(Exception("No data available for ticker XYZ"))()
+    with pytest.raises(ValueError):
+        _failing(ValueError("empty option chain"))()
+    assert sum(rate_limiter._outcomes) == 0
+
+    with pytest.raises(requests.ConnectionError):
+        _failing(requests.ConnectionError("connection reset"))()
+    assert sum(rate_limiter._outcomes) == 1
+
+    rate = rate_limiter.rate
+    response = requests.Response()
+    response.status_code = 429
+    with pytest.raises(requests.HTTPError):
+        _failing(requests.HTTPError("429 Client Error", response=response))()
+    assert rate_limiter.rate < rate
+
+    rate_limiter.configure()
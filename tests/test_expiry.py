@@ -0,0 +1,22 @@
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import days_to_expiry, time_to_expiry
+
+def test_market_holidays_are_excluded_by_default():
+    # Memorial Day (2025-05-26) falls between the two dates
+    as_of = datetime(2025, 5, 23)
+    expirations = ['2025-05-27', '2025-05-23', None]
+
+    days = days_to_expiry(expirations, as_of)
+
+    np.testing.assert_array_equal(days[:2], [1, 0])
+    assert np.isnan(days[2])
+    assert days_to_expiry(expirations[:1], as_of, holidays=[])[0] == 2
+    assert days_to_expiry(expirations[:1], as_of, business_days=False)[0] == 4
+    np.testing.assert_allclose(time_to_expiry(expirations[:2], as_of), [1 / 252, 1 / 252])
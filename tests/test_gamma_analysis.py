@@ -0,0 +1,37 @@
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gamma_analysis import calculate_gamma_flip, calculate_gamma_flips_batch
+
+TODAY = datetime(2025, 5, 13)
+
+def _chain(ticker, spot):
+    rows = []
+    for expiration in ('2025-05-16', '2025-06-20'):
+        for strike in np.arange(0.6, 1.5, 0.05) * spot:
+            rows.append((ticker, spot, expiration, strike, 'call', 0.3, 1000.0))
+            # Heavy put open interest above spot gives a flip below it
+            rows.append((ticker, spot, expiration, strike, 'put', 0.3, 3000.0 if strike > spot else 200.0))
+    return pd.DataFrame(rows, columns=['ticker', 'underlying_price', 'expiration', 'strike',
+                                       'option_type', 'impliedVolatility', 'openInterest'])
+
+def test_batch_matches_per_ticker_with_categorical_ticker():
+    chains = {'AAPL': _chain('AAPL', 100.0), 'SPY': _chain('SPY', 500.0)}
+    for tickers in (['AAPL'], ['AAPL', 'SPY']):
+        snapshot = pd.concat([chains[t] for t in tickers], ignore_index=True)
+        snapshot['ticker'] = snapshot['ticker'].astype('category')
+
+        results, profile = calculate_gamma_flips_batch(snapshot, TODAY, return_profile=True)
+
+        assert list(results) == tickers
+        assert set(profile['ticker']) == set(tickers)
+        for ticker in tickers:
+            spot = chains[ticker]['underlying_price'].iloc[0]
+            expected = calculate_gamma_flip(ticker, chains[ticker], spot, 0.5 * spot, 2.0 * spot, TODAY)
+            assert results[ticker] == expected
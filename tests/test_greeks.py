@@ -0,0 +1,97 @@
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from greeks import add_greeks, add_mid_iv, black_scholes_greeks, bs_price, implied_volatility
+from utils import time_to_expiry
+
+R, Q = 0.03, 0.01
+
+def _grid():
+    S, K, T, vol, is_call = np.meshgrid(
+        [100.0], [70.0, 90.0, 100.0, 110.0, 130.0], [0.02, 0.25, 1.0, 2.0], [0.1, 0.3, 0.8], [True, False]
+    )
+    return S.ravel(), K.ravel(), T.ravel(), vol.ravel(), is_call.ravel()
+
+def test_implied_volatility_round_trip():
+    S, K, T, vol, is_call = _grid()
+    price = bs_price(S, K, T, vol, is_call, R, Q)
+    # Where vega is ~0 (far from the money, or almost expired) the price
+    # tolerance says nothing about the volatility, so only compare the rest
+    priced = black_scholes_greeks(S, K, T, vol, is_call, R, Q)['vega'] > 1e-4
+
+    iv = implied_volatility(price, S, K, T, is_call, R, Q)
+
+    np.testing.assert_allclose(iv[priced], vol[priced], atol=1e-4)
+
+def test_implied_volatility_falls_back_to_bisection():
+    # Far out of the money and short-dated: vega at the starting guess is ~0,
+    # so the solve has to bisect its way up to the answer
+    price = bs_price(100.0, 140.0, 0.05, 0.9, True)
+
+    iv = implied_volatility(np.array([price]), 100.0, 140.0, 0.05, True)
+
+    np.testing.assert_allclose(iv, [0.9], atol=1e-6)
+
+def test_unsolvable_quotes_return_nan():
+    price = np.array([
+        5.0,     # below intrinsic value of 10
+        150.0,   # above the spot a call can be worth
+        np.nan,  # missing quote
+        3.0,     # expired
+        3.0,     # valid
+    ])
+    K = np.array([90.0, 100.0, 100.0, 100.0, 100.0])
+    T = np.array([0.5, 0.5, 0.5, 0.0, 0.5])
+
+    iv = implied_volatility(price, 100.0, K, T, True)
+
+    assert np.isnan(iv[:4]).all()
+    assert np.isfinite(iv[4])
+
+def test_greeks_match_finite_differences():
+    S, K, T, vol, is_call = _grid()
+    greeks = black_scholes_greeks(S, K, T, vol, is_call, R, Q)
+
+    def price(dS=0.0, dT=0.0, dvol=0.0):
+        return bs_price(S + dS, K, T + dT, vol + dvol, is_call, R, Q)
+
+    def delta(dT=0.0, dvol=0.0):
+        return (price(h, dT, dvol) - price(-h, dT, dvol)) / (2 * h)
+
+    h, ht, hv = 1e-2, 1e-5, 1e-5
+    np.testing.assert_allclose(greeks['delta'], delta(), atol=1e-6)
+    np.testing.assert_allclose(greeks['gamma'], (price(h) - 2 * price() + price(-h)) / h**2, atol=1e-4)
+    np.testing.assert_allclose(greeks['vega'], (price(dvol=hv) - price(dvol=-hv)) / (2 * hv) / 100, atol=1e-6)
+    # Theta and charm are per business day: one 1/252 step of T
+    np.testing.assert_allclose(greeks['theta'], -(price(dT=ht) - price(dT=-ht)) / (2 * ht) / 252, atol=1e-6)
+    np.testing.assert_allclose(greeks['vanna'], (delta(dvol=hv) - delta(dvol=-hv)) / (2 * hv), atol=1e-4)
+    np.testing.assert_allclose(greeks['charm'], -(delta(dT=ht) - delta(dT=-ht)) / (2 * ht) / 252, atol=1e-5)
+
+def test_frame_helpers_price_with_business_day_time():
+    today = datetime(2025, 5, 13)
+    df = pd.DataFrame({
+        'strike': [95.0, 100.0, 105.0, 100.0],
+        'expiration': ['2025-06-20'] * 4,
+        'option_type': ['call', 'put', 'call', 'call'],
+        'underlying_price': [100.0] * 4,
+        'impliedVolatility': [0.25] * 4,
+    })
+    T = time_to_expiry(df['expiration'], today)
+    fair = bs_price(100.0, df['strike'].to_numpy(), T, 0.25, (df['option_type'] == 'call').to_numpy())
+    df['bid'] = fair - 0.05
+    df['ask'] = fair + 0.05
+    # One-sided quote
+    df.loc[3, 'bid'] = 0.0
+
+    df = add_greeks(add_mid_iv(df, today), today)
+
+    np.testing.assert_allclose(df['mid_iv'][:3], 0.25, atol=1e-6)
+    assert np.isnan(df['mid_price'][3]) and np.isnan(df['mid_iv'][3])
+    np.testing.assert_allclose(df['time_to_expiry'], T)
+    assert df[['delta', 'gamma', 'vega', 'theta', 'vanna', 'charm']].notna().all().all()
@@ -0,0 +1,74 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_history import (PRICE_HISTORY_COMPACT_AFTER, append_price_history, compact_price_history,
+                           get_price_history_dir, load_previous_run_prices, load_price_history)
+
+def _prices(price, tickers=('VIX', 'SPY')):
+    return pd.DataFrame({'ticker': list(tickers), 'current_price': [float(price)] * len(tickers)})
+
+def test_append_compact_load_round_trip(tmp_path):
+    base_dir = str(tmp_path / 'options_data')
+    first_day = datetime(2025, 1, 2)
+
+    # Legacy yearly file holding the first two evenings
+    legacy = pd.concat([
+        _prices(1).assign(trading_date='2025-01-02', run_type='evening'),
+        _prices(2).assign(trading_date='2025-01-03', run_type='evening'),
+    ])
+    os.makedirs(os.path.join(base_dir, '2025'))
+    legacy.to_parquet(os.path.join(base_dir, '2025', 'price_data_history.parquet'), index=False)
+
+    # Re-run of the second evening plus enough new runs to reach the threshold
+    run_days = [first_day + timedelta(days=i) for i in range(1, PRICE_HISTORY_COMPACT_AFTER + 1)]
+    for i, day in enumerate(run_days[:-1]):
+        append_price_history(_prices(100 + i), day, 'evening', base_dir=base_dir)
+
+    assert compact_price_history(2025, min_files=PRICE_HISTORY_COMPACT_AFTER, base_dir=base_dir) is None
+
+    history = load_price_history(2025, base_dir=base_dir)
+    # The legacy first evening plus one run per file
+    assert len(history) == 2 * len(run_days)
+    # The run file replaces the legacy rows of the same run
+    second = history[history['trading_date'] == '2025-01-03']
+    assert list(second['current_price']) == [100.0, 100.0]
+    assert list(history[history['trading_date'] == '2025-01-02']['current_price']) == [1.0, 1.0]
+
+    append_price_history(_prices(999), run_days[-1], 'evening', base_dir=base_dir)
+    compacted = compact_price_history(2025, min_files=PRICE_HISTORY_COMPACT_AFTER, base_dir=base_dir)
+
+    assert compacted is not None
+    assert os.listdir(get_price_history_dir(2025, base_dir)) == ['compacted.parquet']
+    assert not os.path.exists(os.path.join(base_dir, '2025', 'price_data_history.parquet'))
+    compacted_history = load_price_history(2025, base_dir=base_dir)
+    assert len(compacted_history) == len(history) + 2
+    assert not compacted_history.duplicated(['ticker', 'trading_date', 'run_type']).any()
+
+    # A run saved again after compaction wins over the compacted rows
+    append_price_history(_prices(7), run_days[0], 'evening', base_dir=base_dir)
+    reloaded = load_price_history(2025, tickers=['VIX'], base_dir=base_dir)
+    assert list(reloaded[reloaded['trading_date'] == '2025-01-03']['current_price']) == [7.0]
+    assert len(reloaded) == len(compacted_history) // 2
+
+def test_previous_run_prices_skip_missing_days(tmp_path):
+    base_dir = str(tmp_path / 'options_data')
+    append_price_history(_prices(1), datetime(2024, 12, 31), 'evening', base_dir=base_dir)
+    append_price_history(_prices(2), datetime(2025, 1, 3), 'morning', base_dir=base_dir)
+    append_price_history(_prices(3), datetime(2025, 1, 3), 'evening', base_dir=base_dir)
+    append_price_history(_prices(4), datetime(2025, 1, 6), 'evening', base_dir=base_dir)
+
+    # Monday evening compares with Friday evening
+    previous = load_previous_run_prices(datetime(2025, 1, 6), 'evening', base_dir=base_dir)
+    assert set(previous['trading_date']) == {'2025-01-03'}
+    assert list(previous['current_price']) == [3.0, 3.0]
+
+    # Across the year boundary
+    previous = load_previous_run_prices(datetime(2025, 1, 3), 'evening', base_dir=base_dir)
+    assert set(previous['trading_date']) == {'2024-12-31'}
+
+    assert load_previous_run_prices(datetime(2024, 12, 31), 'evening', base_dir=base_dir) is None
@@ -0,0 +1,67 @@
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshot_dataset import write_snapshot_dataset, load_snapshots, import_legacy_snapshots
+
+TRADING_DATE = datetime(2025, 5, 13)
+
+def _snapshot(tickers):
+    return pd.DataFrame({
+        'ticker': [t for t in tickers for _ in range(3)],
+        'strike': [float(s) for _ in tickers for s in (90, 100, 110)],
+    })
+
+def test_rewrite_with_fewer_tickers_replaces_whole_run(tmp_path):
+    base_dir = str(tmp_path)
+    write_snapshot_dataset(_snapshot(['AAPL', 'MSFT', 'SPY', 'QQQ']), 'raw_options',
+                           TRADING_DATE, 'evening', base_dir=base_dir)
+    write_snapshot_dataset(_snapshot(['SPY']), 'raw_options', TRADING_DATE, 'morning', base_dir=base_dir)
+
+    write_snapshot_dataset(_snapshot(['AAPL']), 'raw_options', TRADING_DATE, 'evening', base_dir=base_dir)
+
+    evening = load_snapshots('raw_options', run_types=['evening'], base_dir=base_dir)
+    assert sorted(evening['ticker'].unique()) == ['AAPL']
+    assert len(evening) == 3
+
+    # Other runs are untouched
+    morning = load_snapshots('raw_options', run_types=['morning'], base_dir=base_dir)
+    assert sorted(morning['ticker'].unique()) == ['SPY']
+
+def test_write_from_file_streams_batches(tmp_path):
+    base_dir = str(tmp_path)
+    path = os.path.join(base_dir, 'raw_options.parquet')
+    _snapshot(['AAPL', 'MSFT']).to_parquet(path)
+
+    write_snapshot_dataset(path, 'raw_options', TRADING_DATE, 'evening', base_dir=base_dir)
+
+    loaded = load_snapshots('raw_options', base_dir=base_dir)
+    assert len(loaded) == 6
+    assert set(loaded['run_type']) == {'evening'}
+    assert not [name for name in loaded.columns if name.startswith('__index_level_')]
+    assert not [d for d in os.listdir(os.path.join(base_dir, 'raw_options')) if d.startswith('.')]
+
+def test_legacy_raw_files_are_migrated_on_import(tmp_path):
+    base_dir = str(tmp_path / 'options_data')
+    dataset_base_dir = str(tmp_path / 'options_dataset')
+    legacy_dir = os.path.join(base_dir, '2025', '05', 'W19', '13', 'evening')
+    os.makedirs(legacy_dir)
+    legacy = _snapshot(['AAPL', 'MSFT']).assign(
+        contractSymbol=[f'C{i}' for i in range(6)], expiration='2025-05-16',
+        option_type='call', run_type='evening',
+    )
+    legacy.to_parquet(os.path.join(legacy_dir, 'raw_options.parquet'))
+
+    current = legacy.assign(contract_id=np.arange(6, dtype=np.int64))
+    write_snapshot_dataset(current, 'raw_options', datetime(2025, 5, 14), 'evening', base_dir=dataset_base_dir)
+
+    assert import_legacy_snapshots(base_dir, dataset_base_dir=dataset_base_dir) == 1
+
+    loaded = load_snapshots('raw_options', base_dir=dataset_base_dir)
+    assert loaded['contract_id'].dtype == np.int64
+    assert loaded['contract_id'].notna().all()
@@ -0,0 +1,120 @@
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import time_to_expiry
+from volatility_analysis import (SVI_PARAM_COLUMNS, TERM_STRUCTURE_TENORS, analyze_term_structure,
+                                 fit_svi_surface, svi_implied_vol, svi_total_variance, term_structure_changes)
+
+TODAY = datetime(2025, 5, 13)
+
+def _smile_frame(vols):
+    """Calls and puts on a strike grid, vols: (ticker, expiration) -> iv(log-moneyness, T)"""
+    rows = []
+    for (ticker, expiration), vol in vols.items():
+        spot = 500.0 if ticker == 'SPY' else 100.0
+        T = time_to_expiry([expiration], TODAY)[0]
+        for moneyness in np.linspace(0.6, 1.6, 41):
+            iv = vol(np.log(moneyness), T)
+            rows += [(ticker, expiration, spot * moneyness, option_type, spot, iv)
+                     for option_type in ('call', 'put')]
+    return pd.DataFrame(rows, columns=['ticker', 'expiration', 'strike', 'option_type',
+                                       'underlying_price', 'impliedVolatility'])
+
+def _assert_no_arbitrage_bounds(fit):
+    assert (fit['b'] >= 0).all()
+    assert (fit['rho'].abs() < 1).all()
+    assert (fit['sigma'] > 0).all()
+    # Minimum total variance a + b*sigma*sqrt(1 - rho^2) is never negative
+    assert (fit['a'] + fit['b'] * fit['sigma'] * np.sqrt(1 - fit['rho']**2) >= -1e-12).all()
+
+def test_fit_svi_surface_recovers_known_parameters():
+    true_params = {
+        ('AAPL', '2025-06-20'): (0.004, 0.08, -0.5, 0.02, 0.1),
+        ('AAPL', '2025-09-19'): (0.01, 0.12, -0.3, 0.0, 0.2),
+        ('SPY', '2025-06-20'): (0.002, 0.06, -0.7, 0.01, 0.08),
+    }
+    df = _smile_frame({key: lambda k, T, p=params: np.sqrt(svi_total_variance(k, *p) / T)
+                       for key, params in true_params.items()})
+
+    fit = fit_svi_surface(df, TODAY)
+
+    assert len(fit) == len(true_params)
+    for (ticker, expiration), params in true_params.items():
+        row = fit[(fit['ticker'] == ticker) & (fit['expiration'] == expiration)].iloc[0]
+        error = np.abs(row[SVI_PARAM_COLUMNS].to_numpy(dtype=float) - params)
+        # a, b, rho, m, sigma
+        assert (error <= [1e-3, 1e-3, 2e-2, 5e-3, 5e-3]).all(), error
+        assert row['rmse'] < 1e-3
+
+        quotes = df[(df['ticker'] == ticker) & (df['expiration'] == expiration)]
+        np.testing.assert_allclose(svi_implied_vol(row, quotes['strike'].to_numpy()),
+                                   quotes['impliedVolatility'], atol=2e-3)
+    _assert_no_arbitrage_bounds(fit)
+
+def test_fit_svi_surface_keeps_parameters_arbitrage_free():
+    # Total variance falling away from the money has no arbitrage-free fit;
+    # the parameters must still be clipped into the admissible region
+    df = _smile_frame({('AAPL', '2025-06-20'): lambda k, T: np.sqrt(np.maximum(0.02 - 0.05 * k**2, 1e-4) / T)})
+
+    fit = fit_svi_surface(df, TODAY)
+
+    assert len(fit) == 1
+    _assert_no_arbitrage_bounds(fit)
+
+def _term_structure_frame(slices):
+    """OTM quotes per (ticker, dte, atm_iv) slice; iv is quadratic in call-equivalent delta"""
+    rows = []
+    for ticker, dte, atm_iv in slices:
+        expiration = f'exp{dte}'
+        for delta in (0.5, 0.4, 0.25, 0.1):
+            rows.append((ticker, expiration, dte, 'call', 110.0, delta))
+        for delta in (-0.4, -0.25, -0.1):
+            rows.append((ticker, expiration, dte, 'put', 90.0, delta))
+    df = pd.DataFrame(rows, columns=['ticker', 'expiration', 'dte', 'option_type', 'strike', 'delta'])
+    df['underlying_price'] = 100.0
+    smile_delta = np.where(df['option_type'] == 'call', df['delta'], 1 + df['delta'])
+    atm = df['ticker'].astype(str) + df['dte'].astype(str)
+    atm = atm.map({f'{t}{d}': v for t, d, v in slices})
+    df['impliedVolatility'] = atm + 0.1 * (smile_delta - 0.5) + 0.2 * (smile_delta - 0.5)**2
+    return df
+
+def test_term_structure_interpolates_between_expirations():
+    df = _term_structure_frame([('AAPL', 30, 0.20), ('AAPL', 60, 0.25), ('AAPL', 120, 0.30), ('SPY', 45, 0.15)])
+
+    result = analyze_term_structure(df, tenors=[7, 30, 60, 90, 180]).set_index(['ticker', 'tenor_days'])
+
+    aapl = result.loc['AAPL', 'atm_iv']
+    # Exact tenor hits take the expiration's own ATM IV
+    assert aapl[30] == pytest.approx(0.20)
+    assert aapl[60] == pytest.approx(0.25)
+    # Between expirations: linear in total variance
+    expected = np.sqrt((0.5 * 0.25**2 * 60 + 0.5 * 0.30**2 * 120) / 90)
+    assert aapl[90] == pytest.approx(expected)
+    # Outside the listed expirations: nearest expiration's IV
+    assert aapl[7] == pytest.approx(0.20)
+    assert aapl[180] == pytest.approx(0.30)
+
+    # A single expiry gives the same smile at every tenor
+    spy = result.loc['SPY']
+    assert len(spy) == 5
+    np.testing.assert_allclose(spy['atm_iv'], 0.15)
+    np.testing.assert_allclose(spy['risk_reversal_25d'], -0.05)
+    np.testing.assert_allclose(spy['butterfly_25d'], 0.0125)
+
+def test_term_structure_changes_by_tenor():
+    prev = analyze_term_structure(_term_structure_frame([('AAPL', 30, 0.20), ('SPY', 45, 0.15)]))
+    curr = analyze_term_structure(_term_structure_frame([('AAPL', 30, 0.22), ('SPY', 45, 0.15)]))
+
+    changes = term_structure_changes(prev, curr).set_index(['ticker', 'tenor_days'])
+
+    assert len(changes) == 2 * len(TERM_STRUCTURE_TENORS)
+    np.testing.assert_allclose(changes.loc['AAPL', 'atm_iv_change'], 0.02)
+    np.testing.assert_allclose(changes.loc['SPY', 'atm_iv_change'], 0.0, atol=1e-12)
+    np.testing.assert_allclose(changes['risk_reversal_25d_change'], 0.0, atol=1e-12)
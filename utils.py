@@ -1,5 +1,8 @@
 # utils.py - Common utilities, constants, and sector mappings
 
+import numpy as np
+import pandas as pd
+
 # Combined list of tickers to monitor
 DEFAULT_TICKERS = [
     # Major indices ETFs
@@ -212,4 +215,80 @@ SECTOR_MAP = {
     
     # Default for any missing tickers
     'DEFAULT': 'Other'
-}
\ No newline at end of file
+}
+
+# NYSE full-day market holidays, for business-day time to expiry
+MARKET_HOLIDAYS = [
+    '2025-01-01', '2025-01-09', '2025-01-20', '2025-02-17', '2025-04-18', '2025-05-26',
+    '2025-06-19', '2025-07-04', '2025-09-01', '2025-11-27', '2025-12-25',
+    '2026-01-01', '2026-01-19', '2026-02-16', '2026-04-03', '2026-05-25', '2026-06-19',
+    '2026-07-03', '2026-09-07', '2026-11-26', '2026-12-25',
+]
+
+def days_to_expiry(expirations, as_of, business_days=True, holidays=None):
+    """
+    Days from as_of to each expiration, computed once per unique expiration
+    
+    Args:
+        expirations (array-like): Expiration dates (strings or datetimes), one per row
+        as_of (datetime): Reference date; for calendar days the time of day is
+            kept, matching (expiration - as_of).days
+        business_days (bool): Count business days (np.busday_count) instead of calendar days
+        holidays (list, optional): Dates excluded from business-day counts,
+            defaults to MARKET_HOLIDAYS (pass [] to count every weekday)
+        
+    Returns:
+        ndarray: Integer days per row (negative for past expirations), float
+            with NaN if any expiration is missing
+    """
+    codes, uniques = pd.factorize(np.asarray(expirations), use_na_sentinel=True)
+    unique_dates = pd.to_datetime(uniques)
+    
+    if business_days:
+        start = np.datetime64(pd.Timestamp(as_of).date(), 'D')
+        unique_days = np.busday_count(start, unique_dates.values.astype('datetime64[D]'),
+                                      holidays=holidays if holidays is not None else MARKET_HOLIDAYS)
+    else:
+        unique_days = ((unique_dates - pd.Timestamp(as_of)) // pd.Timedelta(days=1)).to_numpy()
+    
+    # Broadcast back to rows; rows with a missing expiration get NaN
+    unique_days = np.append(np.asarray(unique_days, dtype=np.int64), 0)
+    days = unique_days[codes]
+    if (codes < 0).any():
+        days = np.where(codes < 0, np.nan, days)
+    return days
+
+def time_to_expiry(expirations, as_of, holidays=None, periods_per_year=252):
+    """
+    Business-day time to expiry in years, as used for option pricing
+    
+    Same-day expirations count as one business day so they never have zero time.
+    
+    Args:
+        expirations (array-like): Expiration dates, one per row
+        as_of (datetime): Reference date
+        holidays (list, optional): Dates excluded from business-day counts,
+            defaults to MARKET_HOLIDAYS
+        periods_per_year (int): Business days per year
+        
+    Returns:
+        ndarray: Time to expiry in years per row
+    """
+    days = days_to_expiry(expirations, as_of, business_days=True, holidays=holidays)
+    return np.where(days == 0, 1, days) / periods_per_year
+
+def contract_ids(symbols):
+    """
+    Stable 64-bit integer ID per option contract symbol
+    
+    The ID is a fixed-key hash of the OCC contractSymbol, so the same contract
+    gets the same ID in every run and snapshots can be joined on one int64
+    column instead of ticker/strike/expiration/option_type.
+    
+    Args:
+        symbols (array-like): contractSymbol values
+        
+    Returns:
+        ndarray: int64 contract IDs
+    """
+    return pd.util.hash_array(np.asarray(symbols, dtype=object)).view(np.int64)
@@ -1,45 +1,437 @@
 # volatility_analysis.py - Volatility surface and skew analysis
 
+import numpy as np
 import pandas as pd
 
+from utils import time_to_expiry
+
 def analyze_skew(df):
     """
     Analyze the volatility skew from options data
-    
+
+    Every (ticker, expiration) slice is handled in one sort + groupby pass:
+    the three nearest OTM puts (moneyness < 0.95) and calls (moneyness > 1.05)
+    are averaged for slices with more than three calls and three puts.
+
     Args:
         df (DataFrame): Dataframe containing options data
-        
+
     Returns:
         DataFrame: Skew analysis results
     """
-    skew_data = {}
-    
-    for ticker in df['ticker'].unique():
-        ticker_df = df[df['ticker'] == ticker]
-        
-        for exp in ticker_df['expiration'].unique():
-            exp_df = ticker_df[ticker_df['expiration'] == exp]
-            calls = exp_df[exp_df['option_type'] == 'call']
-            puts = exp_df[exp_df['option_type'] == 'put']
-            
-            if len(calls) > 3 and len(puts) > 3:
-                otm_puts = puts[puts['moneyness'] < 0.95].sort_values('moneyness', ascending=False).head(3)
-                otm_calls = calls[calls['moneyness'] > 1.05].sort_values('moneyness').head(3)
-                
-                if not otm_puts.empty and not otm_calls.empty:
-                    put_avg_iv = otm_puts['impliedVolatility'].mean()
-                    call_avg_iv = otm_calls['impliedVolatility'].mean()
-                    skew = put_avg_iv - call_avg_iv
-                    
-                    key = f"{ticker}_{exp}"
-                    skew_data[key] = {
-                        'ticker': ticker,
-                        'expiration': exp,
-                        'dte': exp_df['dte'].iloc[0],
-                        'put_iv': put_avg_iv,
-                        'call_iv': call_avg_iv,
-                        'skew': skew,
-                        'skew_direction': 'Downside' if skew > 0 else 'Upside'
-                    }
-    
-    return pd.DataFrame.from_dict(skew_data, orient='index')
\ No newline at end of file
+    keys = ['ticker', 'expiration']
+    if df.empty:
+        return pd.DataFrame()
+
+    # Slice order: tickers in order of appearance, then expirations within each ticker
+    first_rows = df.drop_duplicates(keys)
+    first_rows = first_rows.iloc[np.argsort(pd.factorize(first_rows['ticker'])[0], kind='stable')]
+    slices = first_rows.set_index(keys)['dte']
+
+    # Only slices with more than 3 calls and more than 3 puts qualify
+    counts = df.groupby(keys + ['option_type'], sort=False, observed=True).size().unstack('option_type')
+    counts = counts.reindex(columns=['call', 'put'])
+    eligible = counts[(counts['call'] > 3) & (counts['put'] > 3)].index
+
+    # Nearest three OTM strikes per slice: puts just below 0.95, calls just above 1.05
+    columns = keys + ['moneyness', 'impliedVolatility']
+    otm_puts = df.loc[(df['option_type'] == 'put') & (df['moneyness'] < 0.95), columns]
+    otm_calls = df.loc[(df['option_type'] == 'call') & (df['moneyness'] > 1.05), columns]
+
+    put_iv = (otm_puts.sort_values('moneyness', ascending=False, kind='stable')
+              .groupby(keys, sort=False).head(3)
+              .groupby(keys, observed=True)['impliedVolatility'].mean())
+    call_iv = (otm_calls.sort_values('moneyness', kind='stable')
+               .groupby(keys, sort=False).head(3)
+               .groupby(keys, observed=True)['impliedVolatility'].mean())
+
+    # Keep slices that qualify and have both OTM sides, in slice order
+    result = pd.DataFrame({'dte': slices})
+    result['put_iv'] = put_iv.reindex(result.index)
+    result['call_iv'] = call_iv.reindex(result.index)
+    has_puts = result.index.isin(put_iv.index)
+    has_calls = result.index.isin(call_iv.index)
+    result = result[result.index.isin(eligible) & has_puts & has_calls]
+
+    if result.empty:
+        return pd.DataFrame()
+
+    result['skew'] = result['put_iv'] - result['call_iv']
+    result['skew_direction'] = np.where(result['skew'] > 0, 'Downside', 'Upside')
+
+    result = result.reset_index()
+    result.index = result['ticker'].astype(str) + '_' + result['expiration'].astype(str)
+
+    return result[['ticker', 'expiration', 'dte', 'put_iv', 'call_iv', 'skew', 'skew_direction']]
+
+TERM_STRUCTURE_TENORS = [7, 30, 60, 90]
+
+def _bracket(group, x, target_group, target_x, width, extrapolate=False):
+    """
+    Locate interpolation brackets for many groups at once
+
+    group and x must be sorted by (group, x), with x in [0, width). Keys
+    group*width + x are globally sorted, so one searchsorted finds the bracket
+    of every target inside its own group.
+
+    Returns:
+        tuple: (lo, hi, weight, found) arrays, one entry per target. With
+            extrapolate, targets outside a group's range snap to its nearest
+            point (lo == hi, weight 0); otherwise they are not found.
+    """
+    key = group * width + x
+    target_key = target_group * width + target_x
+    position = np.searchsorted(key, target_key)
+    hi = np.clip(position, 0, len(key) - 1)
+    # From the unclipped position, so targets past the last key keep it as lo
+    lo = np.clip(position - 1, 0, len(key) - 1)
+    hi_in = (group[hi] == target_group) & (key[hi] >= target_key)
+    # An exact hit on a group's first point brackets itself
+    lo = np.where(hi_in & (key[hi] == target_key), hi, lo)
+    lo_in = (group[lo] == target_group) & (key[lo] <= target_key)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(x[hi] > x[lo], (target_x - x[lo]) / (x[hi] - x[lo]), 0.0)
+    found = hi_in & lo_in
+    if extrapolate:
+        # One-sided targets use the nearest point in their group
+        lo = np.where(found | lo_in, lo, hi)
+        hi = np.where(found | hi_in, hi, lo)
+        weight = np.where(found, weight, 0.0)
+        found = lo_in | hi_in
+    return lo, hi, weight, found
+
+def analyze_term_structure(df, tenors=None):
+    """
+    Constant-maturity ATM IV, 25-delta risk reversal and butterfly for every ticker
+
+    Per expiration the OTM quotes form one smile in call-equivalent delta
+    (puts as 1 + delta, using the delta column stored by the greeks stage),
+    and the ATM (50-delta) and 25-delta call/put IVs are interpolated on it.
+    Each ticker's expirations are then interpolated to the fixed tenors
+    linearly in total variance, with expirations and tenors both measured in
+    calendar days / 365; tenors outside the listed expirations take the
+    nearest expiration's IV. All slices and tickers are handled in one
+    vectorized pass.
+
+    Args:
+        df (DataFrame): Vol surface frame with ticker, expiration, strike,
+            option_type, underlying_price, impliedVolatility, delta and dte
+            (calendar days to expiry) columns
+        tenors (list, optional): Tenors in calendar days (default TERM_STRUCTURE_TENORS)
+
+    Returns:
+        DataFrame: One row per ticker and tenor with atm_iv, call_25d_iv,
+            put_25d_iv, risk_reversal_25d and butterfly_25d
+    """
+    tenors = TERM_STRUCTURE_TENORS if tenors is None else list(tenors)
+    columns = ['ticker', 'tenor_days', 'atm_iv', 'call_25d_iv', 'put_25d_iv',
+               'risk_reversal_25d', 'butterfly_25d']
+
+    iv = df['impliedVolatility'].to_numpy(dtype=float)
+    delta = df['delta'].to_numpy(dtype=float)
+    # Calendar-day years, the same convention as the tenors; same-day
+    # expirations count as one day, as in utils.time_to_expiry
+    dte = df['dte'].to_numpy(dtype=float)
+    T = np.where(dte == 0, 1, dte) / 365
+    is_call = (df['option_type'] == 'call').to_numpy()
+    # OTM smile (calls at or above spot, puts below) in call-equivalent delta,
+    # leaving out the often stale ITM quotes
+    smile_delta = np.where(is_call, delta, 1 + delta)
+    with np.errstate(invalid='ignore'):
+        moneyness = df['strike'].to_numpy(dtype=float) / df['underlying_price'].to_numpy(dtype=float)
+        otm = np.where(is_call, moneyness >= 1, moneyness < 1)
+        usable = otm & (iv > 0.01) & (iv < 5) & (T > 0) & np.isfinite(delta)
+    if not usable.any():
+        return pd.DataFrame(columns=columns)
+
+    quotes = df.loc[usable, ['ticker', 'expiration']]
+    slice_codes = quotes.groupby(['ticker', 'expiration'], sort=False, observed=True).ngroup().to_numpy()
+    slice_ticker = quotes.drop_duplicates(['ticker', 'expiration'])['ticker'].to_numpy()
+    n_slices = len(slice_ticker)
+    iv, smile_delta, T = iv[usable], smile_delta[usable], T[usable]
+
+    order = np.lexsort((smile_delta, slice_codes))
+    g, x, y = slice_codes[order], smile_delta[order], iv[order]
+    slice_iv = {}
+    for name, target in (('atm_iv', 0.5), ('call_25d_iv', 0.25), ('put_25d_iv', 0.75)):
+        lo, hi, weight, found = _bracket(g, x, np.arange(n_slices), np.full(n_slices, target), width=2.0)
+        slice_iv[name] = np.where(found, (1 - weight) * y[lo] + weight * y[hi], np.nan)
+
+    slice_T = np.zeros(n_slices)
+    slice_T[slice_codes] = T
+    ticker_codes, tickers = pd.factorize(slice_ticker)
+
+    # Every (ticker, tenor) pair as targets for the tenor interpolation
+    target_ticker = np.repeat(np.arange(len(tickers)), len(tenors))
+    target_T = np.tile(np.asarray(tenors, dtype=float) / 365, len(tickers))
+    result = pd.DataFrame({
+        'ticker': np.asarray(tickers)[target_ticker],
+        'tenor_days': np.tile(tenors, len(tickers)),
+    })
+
+    for name, values in slice_iv.items():
+        valid = np.isfinite(values)
+        order = np.lexsort((slice_T[valid], ticker_codes[valid]))
+        g, t, y = ticker_codes[valid][order], slice_T[valid][order], values[valid][order]
+        column = np.full(len(result), np.nan)
+        if len(g):
+            lo, hi, weight, found = _bracket(g, t, target_ticker, target_T, width=100.0, extrapolate=True)
+            total_variance = (1 - weight) * y[lo]**2 * t[lo] + weight * y[hi]**2 * t[hi]
+            interpolated = np.where(lo == hi, y[lo], np.sqrt(np.maximum(total_variance, 0) / target_T))
+            column[found] = interpolated[found]
+        result[name] = column
+
+    result['risk_reversal_25d'] = result['call_25d_iv'] - result['put_25d_iv']
+    result['butterfly_25d'] = 0.5 * (result['call_25d_iv'] + result['put_25d_iv']) - result['atm_iv']
+    return result[columns]
+
+def term_structure_changes(prev_df, curr_df):
+    """
+    Compare two term structure tables tenor by tenor
+
+    Args:
+        prev_df (DataFrame): Earlier term_structure table
+        curr_df (DataFrame): Current term_structure table
+
+    Returns:
+        DataFrame: Current values, *_prev values and *_change columns per ticker and tenor
+    """
+    metrics = ['atm_iv', 'call_25d_iv', 'put_25d_iv', 'risk_reversal_25d', 'butterfly_25d']
+    merged = pd.merge(curr_df[['ticker', 'tenor_days'] + metrics],
+                      prev_df[['ticker', 'tenor_days'] + metrics],
+                      on=['ticker', 'tenor_days'], suffixes=('', '_prev'))
+    for metric in metrics:
+        merged[f'{metric}_change'] = merged[metric] - merged[f'{metric}_prev']
+    return merged
+
+SVI_PARAM_COLUMNS = ['a', 'b', 'rho', 'm', 'sigma']
+
+def svi_total_variance(k, a, b, rho, m, sigma):
+    """
+    Raw SVI total implied variance w(k) = a + b*(rho*(k - m) + sqrt((k - m)^2 + sigma^2))
+
+    Args:
+        k (ndarray): Log-moneyness log(K/S)
+        a, b, rho, m, sigma (ndarray): SVI parameters, broadcastable against k
+
+    Returns:
+        ndarray: Total implied variance (IV^2 * T)
+    """
+    x = k - m
+    return a + b * (rho * x + np.sqrt(x**2 + sigma**2))
+
+def _svi_linear_fit(k, w, slice_id, n_slices, m, sigma):
+    """
+    Best (a, d, c) of w = a + d*y + c*sqrt(y^2 + 1), y = (k - m)/sigma, for every slice at once
+
+    For fixed (m, sigma) raw SVI is linear in a, d = b*rho*sigma and c = b*sigma,
+    so each slice is a 3x3 least-squares problem. The normal equations of all
+    slices are accumulated with bincount and solved as one batched system, then
+    the parameters are clipped to c >= 0, |d| < c and non-negative minimum variance.
+
+    Returns:
+        tuple: (a, d, c, sse) arrays with one entry per slice
+    """
+    y = (k - m[slice_id]) / sigma[slice_id]
+    s = np.sqrt(y**2 + 1)
+    basis = (np.ones_like(y), y, s)
+
+    def total(values):
+        return np.bincount(slice_id, weights=values, minlength=n_slices)
+
+    A = np.empty((n_slices, 3, 3))
+    for i in range(3):
+        for j in range(i, 3):
+            A[:, i, j] = A[:, j, i] = total(basis[i] * basis[j])
+    rhs = np.stack([total(basis[i] * w) for i in range(3)], axis=1)
+    sww = total(w * w)
+
+    ridge = 1e-12 * np.eye(3)
+    a, d, c = np.linalg.solve(A + ridge, rhs[..., None])[..., 0].T
+
+    # Arbitrage-free region of the raw parameters; re-solve a if anything was clipped
+    clipped_c = np.maximum(c, 0)
+    clipped_d = np.clip(d, -0.999 * clipped_c, 0.999 * clipped_c)
+    changed = (clipped_c != c) | (clipped_d != d)
+    c, d = clipped_c, clipped_d
+    a = np.where(changed, (rhs[:, 0] - d * A[:, 0, 1] - c * A[:, 0, 2]) / A[:, 0, 0], a)
+    a = np.maximum(a, -np.sqrt(c**2 - d**2))
+
+    beta = np.stack([a, d, c], axis=1)
+    sse = sww - 2 * np.einsum('ni,ni->n', beta, rhs) + np.einsum('ni,nij,nj->n', beta, A, beta)
+    return a, d, c, sse
+
+def fit_svi_surface(df, today, iv_column='impliedVolatility', min_points=5,
+                    moneyness_range=(0.5, 2.0), refinements=3, holidays=None):
+    """
+    Calibrate a raw SVI smile to every ticker/expiration slice in one batched pass
+
+    Each slice is fitted on its OTM quotes (puts below spot, calls at or
+    above) in total variance. (m, sigma) are found by a coarse grid search
+    followed by zoomed refinements; for every candidate the remaining
+    parameters of all slices come from one batched linear solve, so no
+    optimizer runs per slice.
+
+    Args:
+        df (DataFrame): Vol surface frame with ticker, expiration, strike,
+            option_type, underlying_price and an implied volatility column
+        today (datetime): Valuation date
+        iv_column (str): Column holding the volatility to fit
+        min_points (int): Minimum number of quotes for a slice to be fitted
+        moneyness_range (tuple): Strike/spot range of quotes used in the fit
+        refinements (int): Number of zoomed grid refinements after the coarse grid
+        holidays (list, optional): Market holidays excluded from time to expiry
+
+    Returns:
+        DataFrame: One row per slice with ticker, expiration, underlying_price,
+            time_to_expiry, the SVI_PARAM_COLUMNS, n_points and rmse (in IV)
+    """
+    columns = ['ticker', 'expiration', 'underlying_price', 'time_to_expiry'] + SVI_PARAM_COLUMNS + ['n_points', 'rmse']
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    spot = df['underlying_price'].to_numpy(dtype=float)
+    strike = df['strike'].to_numpy(dtype=float)
+    iv = df[iv_column].to_numpy(dtype=float)
+    T = time_to_expiry(df['expiration'], today, holidays=holidays)
+    is_call = (df['option_type'] == 'call').to_numpy()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        moneyness = strike / spot
+        otm = np.where(is_call, moneyness >= 1, moneyness < 1)
+        usable = (otm & (iv > 0.01) & (iv < 5) & (T > 0)
+                  & (moneyness >= moneyness_range[0]) & (moneyness <= moneyness_range[1]))
+
+    quotes = df.loc[usable, ['ticker', 'expiration', 'underlying_price']]
+    slice_codes = quotes.groupby(['ticker', 'expiration'], sort=False, observed=True).ngroup().to_numpy()
+    n_points = np.bincount(slice_codes, minlength=slice_codes.max() + 1 if len(slice_codes) else 0)
+    keep = n_points[slice_codes] >= min_points
+    if not keep.any():
+        return pd.DataFrame(columns=columns)
+
+    slices = quotes[keep].drop_duplicates(['ticker', 'expiration']).reset_index(drop=True)
+    slice_id = pd.factorize(slice_codes[keep])[0]
+    n_slices = len(slices)
+    k = np.log(moneyness[usable][keep])
+    t = T[usable][keep]
+    w = iv[usable][keep]**2 * t
+    slices['time_to_expiry'] = np.bincount(slice_id, weights=t) / np.bincount(slice_id)
+
+    # Coarse grid scaled to each slice's log-moneyness span
+    k_min = np.full(n_slices, np.inf)
+    k_max = np.full(n_slices, -np.inf)
+    np.minimum.at(k_min, slice_id, k)
+    np.maximum.at(k_max, slice_id, k)
+    span = np.maximum(k_max - k_min, 1e-3)
+    m_grid = [k_min + u * span for u in np.linspace(0, 1, 17)]
+    sigma_grid = [span * f for f in np.geomspace(0.02, 2, 12)]
+
+    best_sse = np.full(n_slices, np.inf)
+    best = np.zeros((5, n_slices))
+
+    def evaluate(m, sigma):
+        a, d, c, sse = _svi_linear_fit(k, w, slice_id, n_slices, m, sigma)
+        better = sse < best_sse
+        best_sse[better] = sse[better]
+        for row, values in enumerate((a, d, c, m, sigma)):
+            best[row, better] = values[better]
+
+    for m in m_grid:
+        for sigma in sigma_grid:
+            evaluate(m, sigma)
+
+    # Zoom in around each slice's best (m, sigma)
+    m_step = span / 16
+    sigma_factor = np.sqrt(np.geomspace(0.02, 2, 12)[1] / 0.02)
+    for _ in range(refinements):
+        center_m, center_sigma = best[3].copy(), best[4].copy()
+        for u in np.linspace(-1, 1, 5):
+            for f in np.geomspace(1 / sigma_factor, sigma_factor, 5):
+                evaluate(center_m + u * m_step, np.maximum(center_sigma * f, 1e-4))
+        m_step = m_step / 2
+        sigma_factor = np.sqrt(sigma_factor)
+
+    a, d, c, m, sigma = best
+    slices['a'] = a
+    slices['b'] = c / sigma
+    slices['rho'] = np.divide(d, c, out=np.zeros(n_slices), where=c > 0)
+    slices['m'] = m
+    slices['sigma'] = sigma
+    slices['n_points'] = np.bincount(slice_id)
+
+    fitted = np.sqrt(np.maximum(svi_total_variance(k, *(slices[p].to_numpy()[slice_id] for p in SVI_PARAM_COLUMNS)), 0) / t)
+    slices['rmse'] = np.sqrt(np.bincount(slice_id, weights=(fitted - np.sqrt(w / t))**2) / slices['n_points'])
+    return slices[columns]
+
+def svi_implied_vol(params, strike, time_to_expiry=None):
+    """
+    Implied volatility from fitted SVI parameters, without touching raw rows
+
+    Args:
+        params (DataFrame or Series): SVI parameter row(s) from fit_svi_surface,
+            aligned with strike
+        strike (float or ndarray): Strike price(s)
+        time_to_expiry (float or ndarray, optional): Tenor in years; defaults
+            to the slice's own time_to_expiry
+
+    Returns:
+        ndarray: Implied volatility
+    """
+    T = np.asarray(params['time_to_expiry'] if time_to_expiry is None else time_to_expiry, dtype=float)
+    k = np.log(np.asarray(strike, dtype=float) / np.asarray(params['underlying_price'], dtype=float))
+    w = svi_total_variance(k, *(np.asarray(params[p], dtype=float) for p in SVI_PARAM_COLUMNS))
+    return np.sqrt(np.maximum(w, 0) / T)
+
+def svi_surface_vol(params, ticker, strike, time_to_expiry):
+    """
+    Implied volatility at any strike and tenor of one ticker's fitted surface
+
+    Total variance is evaluated on the two fitted expirations around the
+    requested tenor at the same log-moneyness and interpolated linearly in
+    time; tenors outside the fitted range use the nearest slice's smile.
+
+    Args:
+        params (DataFrame): SVI parameter table from fit_svi_surface
+        ticker (str): Ticker symbol
+        strike (float or ndarray): Strike price(s)
+        time_to_expiry (float): Tenor in years
+
+    Returns:
+        ndarray: Implied volatility (NaN if the ticker has no fitted slices)
+    """
+    smiles = params[params['ticker'] == ticker].sort_values('time_to_expiry')
+    strike = np.asarray(strike, dtype=float)
+    if smiles.empty:
+        return np.full(strike.shape, np.nan)
+
+    tenors = smiles['time_to_expiry'].to_numpy()
+    upper = int(np.clip(np.searchsorted(tenors, time_to_expiry), 0, len(tenors) - 1))
+    lower = max(upper - 1, 0) if tenors[upper] > time_to_expiry else upper
+    k = np.log(strike / smiles['underlying_price'].iloc[0])
+
+    def total_variance(row):
+        return svi_total_variance(k, *(smiles[p].iloc[row] for p in SVI_PARAM_COLUMNS))
+
+    if lower == upper:
+        # At or outside the fitted tenors: keep that smile's implied volatility
+        return np.sqrt(np.maximum(total_variance(lower), 0) / tenors[lower])
+
+    weight = (time_to_expiry - tenors[lower]) / (tenors[upper] - tenors[lower])
+    w = (1 - weight) * total_variance(lower) + weight * total_variance(upper)
+    return np.sqrt(np.maximum(w, 0) / time_to_expiry)
+
+def load_svi_params(filepath, tickers=None, columns=None):
+    """
+    Load a saved svi_params.parquet, reading only what is needed
+
+    Args:
+        filepath (str): Path to svi_params.parquet
+        tickers (list, optional): Only load these tickers
+        columns (list, optional): Only load these columns
+
+    Returns:
+        DataFrame: SVI parameter rows
+    """
+    filters = [('ticker', 'in', list(tickers))] if tickers is not None else None
+    return pd.read_parquet(filepath, columns=columns, filters=filters)